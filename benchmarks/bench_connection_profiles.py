@@ -0,0 +1,101 @@
+# Mamba Password Manager - Connection Profile Benchmark
+
+# Modules
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mamba_database_connection import connect, CONNECTION_PROFILES
+
+
+def open_connection(path, profile):
+    """This function opens a connection with the given profile, or an untuned connection for the 'default' profile."""
+    if profile == "default":
+        return sqlite3.connect(path, timeout=5)
+    return connect(path, profile)
+
+
+def commit_latency(path, profile, commits):
+    """This function measures the average time taken to insert one row and commit it.
+
+    Returns:
+        float: The average commit latency in milliseconds
+    """
+    conn = open_connection(path, profile)
+    start = time.perf_counter()
+    for i in range(commits):
+        conn.execute("INSERT INTO passwords (user_id, website, encrypted_password) VALUES (?, ?, ?)", ("u", f"w{i}", b"x" * 120))
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed / commits * 1000
+
+
+def concurrent_reads(path, profile, readers, seconds):
+    """This function measures how many reads the reader threads complete while another thread is committing writes.
+
+    Returns:
+        float: The number of reads completed per second across all readers
+    """
+    stop = threading.Event()
+    counts = [0] * readers
+
+    def writer():
+        conn = open_connection(path, profile)
+        i = 0
+        while not stop.is_set():
+            conn.execute("UPDATE passwords SET encrypted_password=? WHERE id=?", (b"y" * 120, i % 100 + 1))
+            conn.commit()
+            i += 1
+        conn.close()
+
+    def reader(index):
+        conn = open_connection(path, profile)
+        while not stop.is_set():
+            try:
+                conn.execute("SELECT encrypted_password FROM passwords WHERE id=?", (index % 100 + 1,)).fetchone()
+                counts[index] += 1
+            except sqlite3.OperationalError:
+                pass
+            # a rollback journal blocks readers while the writer commits
+        conn.close()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main():
+    """This function compares commit latency and concurrent read throughput between an untuned connection and each connection profile."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--commits", type=int, default=500)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10}{'commit ms':>12}{'reads/s':>12}")
+    for profile in ["default", *CONNECTION_PROFILES]:
+        path = os.path.join(tempfile.mkdtemp(prefix="mamba_bench_"), "bench.db")
+        conn = open_connection(path, profile)
+        conn.execute("CREATE TABLE passwords (id INTEGER PRIMARY KEY, user_id TEXT, website TEXT, encrypted_password BLOB)")
+        conn.commit()
+        conn.close()
+
+        latency = commit_latency(path, profile, args.commits)
+        reads = concurrent_reads(path, profile, args.readers, args.seconds)
+        print(f"{profile:<10}{latency:>12.3f}{reads:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Mamba Password Manager - Crypto Engine Benchmark
+
+# Modules
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# runs against throwaway database files so the real vault is never touched
+os.chdir(tempfile.mkdtemp(prefix="mamba_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mamba_crypto_engine import MambaCryptoEngine
+from mamba_password_vault_database import account_db, password_db
+
+
+def main():
+    """This function seeds a vault with synthetic entries, then reads the whole vault back with 'iter_passwords' using crypto engines with
+    an increasing number of workers, and prints the decryption throughput of each."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    parser.add_argument("--page-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    account_db.create_mamba_account_table()
+    password_db.create_mamba_password_vault_table()
+    account_db.create_mamba_account("benchuser", "BenchPassw0rd", "+440000000000")
+    password_db.generate_master_key("benchuser")
+
+    start = time.perf_counter()
+    password_db.add_passwords(
+        "benchuser",
+        ((f"site{i}.example.com", f"password-{i}") for i in range(args.entries)),
+    )
+    print(f"seeded {args.entries} entries in {time.perf_counter() - start:.2f}s")
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= (os.cpu_count() or 1):
+        worker_counts.append(worker_counts[-1] * 2)
+
+    print(f"{'workers':<10}{'seconds':>10}{'entries/s':>14}{'speedup':>10}")
+    baseline = None
+    for workers in worker_counts:
+        password_db.crypto_engine = MambaCryptoEngine(args.executor, workers)
+        start = time.perf_counter()
+        count = sum(1 for _ in password_db.iter_passwords("benchuser", page_size=args.page_size))
+        elapsed = time.perf_counter() - start
+        password_db.crypto_engine.close()
+
+        baseline = baseline or elapsed
+        print(f"{workers:<10}{elapsed:>10.2f}{count / elapsed:>14.0f}{baseline / elapsed:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
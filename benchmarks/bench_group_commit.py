@@ -0,0 +1,83 @@
+# Mamba Password Manager - Group Commit Benchmark
+
+# Modules
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# runs against throwaway database files so the real vault is never touched
+BENCH_DIR = tempfile.mkdtemp(prefix="mamba_bench_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mamba_database_connection import MambaGroupCommit, CONNECTION_PROFILES, GROUP_COMMIT_MAX_OPS, GROUP_COMMIT_WINDOW
+from mamba_database_registry import MambaDatabaseRegistry
+
+
+def bench_mode(name, profile, group_commit, bursts, burst_size, idle):
+    """This function sends bursts of adds, updates and deletes separated by idle gaps, as a user importing, editing and tidying their
+    vault would, and times the writes inside the bursts.
+
+    Returns:
+        tuple: The writes per second inside the bursts, and the p50 and p99 latency of a write in milliseconds
+    """
+    directory = os.path.join(BENCH_DIR, f"{profile}-{name}")
+    os.makedirs(directory)
+    os.chdir(directory)
+    registry = MambaDatabaseRegistry(profile, group_commit=group_commit)
+    registry.create_tables()
+    registry.get_account_db().create_mamba_account("benchuser", "BenchPassw0rd", "+440000000000")
+    password_db = registry.get_password_vault_db()
+    password_db.generate_master_key("benchuser")
+    password_db.unlock_vault("benchuser")
+
+    latencies = []
+    busy = 0.0
+    for burst in range(bursts):
+        start = time.perf_counter()
+        for i in range(burst_size):
+            website = f"site{burst}-{i}.example.com"
+            for write in (
+                lambda: password_db.add_password("benchuser", website, "password"),
+                lambda: password_db.update_password("benchuser", website, "updated"),
+                lambda: password_db.delete_password("benchuser", website),
+            ):
+                write_start = time.perf_counter()
+                write()
+                latencies.append(time.perf_counter() - write_start)
+        busy += time.perf_counter() - start
+        time.sleep(idle)
+        # the idle gap lets the group commit window pass, as it would between bursts of real use
+
+    registry.close_all()
+    os.chdir(BENCH_DIR)
+    latencies.sort()
+    return (
+        len(latencies) / busy,
+        latencies[len(latencies) // 2] * 1000,
+        latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    )
+
+
+def main():
+    """This function compares write throughput under bursty load with every write committed straight away, and with group commit."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=50)
+    parser.add_argument("--idle", type=float, default=0.1)
+    parser.add_argument("--max-ops", type=int, default=GROUP_COMMIT_MAX_OPS)
+    parser.add_argument("--window", type=float, default=GROUP_COMMIT_WINDOW)
+    parser.add_argument("--profiles", nargs="+", default=list(CONNECTION_PROFILES))
+    args = parser.parse_args()
+
+    modes = {"immediate": None, "group": MambaGroupCommit(args.max_ops, args.window)}
+    print(f"{'profile':<9}{'mode':<11}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for profile in args.profiles:
+        for name, group_commit in modes.items():
+            throughput, p50, p99 = bench_mode(name, profile, group_commit, args.bursts, args.burst_size, args.idle)
+            print(f"{profile:<9}{name:<11}{throughput:>10.0f}{p50:>9.3f}{p99:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
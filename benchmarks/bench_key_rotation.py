@@ -0,0 +1,47 @@
+# Mamba Password Manager - Key Rotation Benchmark
+
+# Modules
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# runs against throwaway database files so the real vault is never touched
+os.chdir(tempfile.mkdtemp(prefix="mamba_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mamba_crypto_engine import MambaCryptoEngine
+from mamba_password_vault_database import account_db, password_db, ROTATION_BATCH_SIZE
+
+
+def main():
+    """This function seeds a vault with synthetic entries and times a full master key rotation over it."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=ROTATION_BATCH_SIZE)
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    account_db.create_mamba_account_table()
+    password_db.create_mamba_password_vault_table()
+    account_db.create_mamba_account("benchuser", "BenchPassw0rd", "+440000000000")
+    password_db.generate_master_key("benchuser")
+    password_db.add_passwords(
+        "benchuser",
+        ((f"site{i}.example.com", f"password-{i}") for i in range(args.entries)),
+    )
+
+    password_db.crypto_engine = MambaCryptoEngine(args.executor, args.workers)
+    start = time.perf_counter()
+    password_db.rotate_master_key("benchuser", batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    password_db.crypto_engine.close()
+
+    print(f"rotated {args.entries} entries in {elapsed:.2f}s ({args.entries / elapsed:.0f} entries/s) "
+          f"with {password_db.crypto_engine.workers} {args.executor} workers, batches of {args.batch_size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Mamba Password Manager - Query Count Benchmark
+
+# Modules
+import os
+import sys
+import tempfile
+
+# runs against throwaway database files so the real vault is never touched
+os.chdir(tempfile.mkdtemp(prefix="mamba_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mamba_password_vault_database import account_db, password_db
+
+
+class QueryCounter:
+    def __init__(self, *connections):
+        """This function initialises the 'QueryCounter' class and registers a trace callback on every connection passed in, so each SQL
+        statement executed on them is counted.
+
+        Args:
+            connections (sqlite3.Connection): The connections to count statements on
+        """
+        self.count = 0
+        self.last = None
+        # the last statement counted, as SQLite reports a statement again for every trigger step it runs
+        for conn in connections:
+            conn.set_trace_callback(self.trace)
+
+    def trace(self, statement):
+        """This function is called by SQLite for every statement executed and increments the counter, so it counts round trips to the
+        database. It ignores the transaction control statements which are issued implicitly by the sqlite3 module, the '-- ' lines
+        reported for the statements run inside triggers and the full-text index, and the repeats of a statement reported for each of
+        its trigger steps."""
+        if statement.startswith("-- ") or statement == self.last:
+            return
+        if statement.split(None, 1)[0].upper() in ("BEGIN", "COMMIT", "ROLLBACK"):
+            return
+        self.last = statement
+        self.count += 1
+
+    def measure(self, function, *args):
+        """This function runs a function and returns how many SQL statements it executed.
+
+        Args:
+            function (callable): The function to measure
+            args: The arguments passed to the function
+
+        Returns:
+            int: The number of SQL statements executed
+        """
+        self.count = 0
+        self.last = None
+        function(*args)
+        return self.count
+
+
+def main():
+    """This function seeds a user with a master key and prints the number of SQL statements executed by each vault operation, both for
+    the first call of a session (cold) and once the session has been unlocked (warm)."""
+    account_db.create_mamba_account_table()
+    password_db.create_mamba_password_vault_table()
+    account_db.create_mamba_account("benchuser", "BenchPassw0rd", "+440000000000")
+    password_db.generate_master_key("benchuser")
+
+    counter = QueryCounter(account_db.conn, password_db.conn)
+    operations = [
+        ("add_password", password_db.add_password, ("benchuser", "{}", "secret")),
+        ("website_exists", password_db.website_exists, ("benchuser", "{}")),
+        ("update_password", password_db.update_password, ("benchuser", "{}", "secret2")),
+        ("view_passwords", password_db.view_passwords, ("benchuser",)),
+        ("delete_password", password_db.delete_password, ("benchuser", "{}")),
+    ]
+    websites = ["cold.example.com", "warm.example.com"]
+
+    print(f"{'operation':<20}{'cold':>8}{'warm':>8}")
+    for name, function, args in operations:
+        password_db.lock_vault("benchuser")
+        # the first call of each operation has to unlock the vault, the second reuses the session
+        counts = [
+            counter.measure(function, *(arg.format(website) for arg in args))
+            for website in websites
+        ]
+        print(f"{name:<20}{counts[0]:>8}{counts[1]:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Mamba Password Manager - Query Profiler Benchmark
+
+# Modules
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# runs against throwaway database files so the real vault is never touched
+os.chdir(tempfile.mkdtemp(prefix="mamba_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mamba_database_registry import MambaDatabaseRegistry
+from mamba_query_profiler import MambaQueryProfiler
+
+
+def run(registry, username, ops):
+    """This function times a mix of add, update, lookup and delete calls against the registry's vault.
+
+    Returns:
+        float: The time taken in seconds
+    """
+    password_db = registry.get_password_vault_db()
+    start = time.perf_counter()
+    for i in range(ops):
+        password_db.add_password(username, f"new{i}.example.com", "password")
+        password_db.update_password(username, f"new{i}.example.com", "updated")
+        password_db.website_exists(username, f"new{i}.example.com")
+        password_db.delete_password(username, f"new{i}.example.com")
+    return time.perf_counter() - start
+
+
+def main():
+    """This function compares the vault's hot paths with profiling disabled and enabled, and prints the statements counted for each
+    method, to show the profiler adds nothing when it is disabled."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--entries", type=int, default=10000)
+    args = parser.parse_args()
+
+    registries = {"disabled": MambaDatabaseRegistry(), "enabled": MambaDatabaseRegistry(profiler=MambaQueryProfiler(log_path=os.devnull))}
+    registries["disabled"].create_tables()
+    registries["disabled"].get_account_db().create_mamba_account("benchuser", "BenchPassw0rd", "+440000000000")
+    registries["disabled"].get_password_vault_db().generate_master_key("benchuser")
+    registries["disabled"].get_password_vault_db().add_passwords(
+        "benchuser", ((f"site{i}.example.com", f"password-{i}") for i in range(args.entries))
+    )
+    # both registries share the same database files
+
+    for name, registry in registries.items():
+        elapsed = run(registry, "benchuser", args.ops)
+        connection = type(registry.get_password_vault_db().conn).__name__
+        print(f"{name:<10}{args.ops * 4 / elapsed:>10.0f} calls/s  ({connection})")
+
+    report = registries["enabled"].profiler.report()
+    print(json.dumps({name: {key: method[key] for key in ("calls", "statements", "queries")} for name, method in report["methods"].items()}, indent=2))
+    for registry in registries.values():
+        registry.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Mamba Password Manager - Reveal Cache Benchmark
+
+# Modules
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# runs against throwaway database files so the real vault is never touched
+os.chdir(tempfile.mkdtemp(prefix="mamba_bench_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mamba_database_registry import MambaDatabaseRegistry
+from mamba_password_vault_database import MambaPasswordVaultDB
+from mamba_reveal_cache import REVEAL_CACHE_SIZE, REVEAL_CACHE_TTL
+
+# Constants
+CACHE_SIZES = [0, 16, REVEAL_CACHE_SIZE, 256]
+
+
+def bench_size(size, ttl, entry_ids, reveals, skew):
+    """This function reveals entries picked with a skewed distribution, as a user revealing the same few logins over and over would, with
+    a reveal cache of the given size.
+
+    Returns:
+        tuple: The reveals per second, and the cache's counters
+    """
+    password_db = MambaPasswordVaultDB(reveal_cache_size=size, reveal_cache_ttl=ttl)
+    picks = random.Random(0).choices(entry_ids, weights=[1 / (rank + 1) ** skew for rank in range(len(entry_ids))], k=reveals)
+    # the same picks are revealed for every size
+
+    start = time.perf_counter()
+    for entry_id in picks:
+        password_db.reveal("benchuser", entry_id)
+    elapsed = time.perf_counter() - start
+
+    stats = password_db.reveal_cache_stats()
+    password_db.close_all()
+    return reveals / elapsed, stats
+
+
+def main():
+    """This function compares the throughput and hit rate of repeated reveals across reveal cache sizes, to help tune the cache size."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--reveals", type=int, default=20000)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--ttl", type=float, default=REVEAL_CACHE_TTL)
+    parser.add_argument("--sizes", type=int, nargs="+", default=CACHE_SIZES)
+    args = parser.parse_args()
+
+    registry = MambaDatabaseRegistry()
+    registry.create_tables()
+    registry.get_account_db().create_mamba_account("benchuser", "BenchPassw0rd", "+440000000000")
+    password_db = registry.get_password_vault_db()
+    password_db.generate_master_key("benchuser")
+    password_db.add_passwords("benchuser", ((f"site{i}.example.com", f"password-{i}") for i in range(args.entries)))
+    entry_ids = [entry["id"] for entry in password_db.list_passwords("benchuser")]
+    registry.close_all()
+
+    print(f"{'size':>6}{'reveals/s':>12}{'hit rate':>10}{'evictions':>11}")
+    for size in args.sizes:
+        throughput, stats = bench_size(size, args.ttl, entry_ids, args.reveals, args.skew)
+        print(f"{size:>6}{throughput:>12.0f}{stats['hit_rate']:>10.1%}{stats['evictions']:>11}")
+
+
+if __name__ == "__main__":
+    main()
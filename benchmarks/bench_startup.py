@@ -0,0 +1,104 @@
+# Mamba Password Manager - Startup Benchmark
+
+# Modules
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# each scenario runs the database work done between launching 'main.py' and the main GUI appearing, without opening any windows
+SETUP = """
+import sqlite3, sys, time
+sys.path.insert(0, {root!r})
+opened = []
+connect = sqlite3.connect
+def counting_connect(*args, **kwargs):
+    opened.append(args[0])
+    return connect(*args, **kwargs)
+sqlite3.connect = counting_connect
+start = time.perf_counter()
+"""
+
+SCENARIOS = {
+    "separate": """
+from mamba_account_database import MambaAccountDB
+from mamba_password_vault_database import MambaPasswordVaultDB
+db = MambaAccountDB()
+pv_db = MambaPasswordVaultDB()
+db.create_mamba_account_table()
+pv_db.create_mamba_password_vault_table()
+# main.py
+login_conn = sqlite3.connect("mamba_userdata.db")
+# LoginGUI
+password_vault_db = MambaPasswordVaultDB()
+account_db = MambaAccountDB()
+list(password_vault_db.list_passwords("user"))
+# MainGUI
+""",
+    "registry": """
+from mamba_database_registry import registry
+registry.create_tables()
+# main.py
+list(registry.get_password_vault_db().list_passwords("user"))
+# MainGUI
+""",
+}
+
+PREPARE = """
+from mamba_database_registry import registry
+registry.create_tables()
+registry.get_account_db().create_mamba_account("user", "Passw0rd!", "+10000000000")
+registry.get_password_vault_db().generate_master_key("user")
+registry.get_password_vault_db().add_passwords("user", ({{"website": f"site{{i}}.com", "password": "x"}} for i in range({entries})))
+"""
+
+REPORT = """
+print(json.dumps({{"ms": (time.perf_counter() - start) * 1000, "connections": len(opened)}}))
+"""
+
+
+def run_code(code, cwd):
+    """This function runs code in a fresh interpreter, so no modules or connections are shared between runs.
+
+    Returns:
+        str: The output of the code
+    """
+    return subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+
+def run_scenario(name, cwd):
+    """This function runs a startup scenario.
+
+    Returns:
+        dict: The time taken in milliseconds, and the number of SQLite connections opened
+    """
+    code = "import json\n" + SETUP.format(root=ROOT) + SCENARIOS[name] + REPORT.format()
+    return json.loads(run_code(code, cwd).strip().splitlines()[-1])
+
+
+def main():
+    """This function compares the time and number of connections needed to reach the main GUI with separate database objects for each
+    module, and with the shared database registry."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--entries", type=int, default=1000)
+    args = parser.parse_args()
+
+    cwd = tempfile.mkdtemp(prefix="mamba_bench_")
+    run_code(SETUP.format(root=ROOT) + PREPARE.format(entries=args.entries), cwd)
+    # creates the database files and a user with a vault, so every measured run starts from an existing vault
+
+    print(f"{'scenario':<12}{'median ms':>12}{'connections':>14}")
+    for name in SCENARIOS:
+        results = [run_scenario(name, cwd) for _ in range(args.runs)]
+        median = statistics.median(result["ms"] for result in results)
+        print(f"{name:<12}{median:>12.2f}{results[0]['connections']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# Mamba Password Manager - Vault Operation Benchmark
+
+# Modules
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+# runs against throwaway database files so the real vault is never touched
+BENCH_DIR = tempfile.mkdtemp(prefix="mamba_bench_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mamba_account_database import MambaAccountDB
+from mamba_password_vault_database import MambaPasswordVaultDB
+
+# Constants
+VAULT_SIZES = [1000, 10000, 100000, 1000000]
+BENCH_PASSWORD = "BenchPassw0rd"
+
+
+def percentile(latencies, fraction):
+    """This function finds a percentile of a sorted list of latencies, using the nearest rank."""
+    index = min(len(latencies) - 1, max(0, round(fraction * len(latencies)) - 1))
+    return latencies[index]
+
+
+def summarise(latencies):
+    """This function summarises the latencies of one operation.
+
+    Returns:
+        dict: The number of operations, operations per second, and the mean, p50 and p99 latency in milliseconds
+    """
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) / total if total else None,
+        "mean_ms": total / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def timed(function, calls):
+    """This function times each call of a function separately.
+
+    Args:
+        function (callable): The function to call with the arguments of each call
+        calls (iterable): The argument tuples of each call
+
+    Returns:
+        list: The time taken by each call in seconds
+    """
+    latencies = []
+    for args in calls:
+        start = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def seed(size, users, other_entries, seed_value):
+    """This function creates fresh databases holding synthetic users, where the first user's vault has 'size' entries and every other
+    user's vault has 'other_entries' entries, so the indexes are shared between users as they are in a real vault.
+
+    Returns:
+        tuple: The account database, the password vault database, and the username of the benchmarked user
+    """
+    directory = os.path.join(BENCH_DIR, str(size))
+    os.makedirs(directory)
+    os.chdir(directory)
+    # the account database is opened relative to the working directory
+
+    account_db = MambaAccountDB()
+    password_db = MambaPasswordVaultDB()
+    account_db.create_mamba_account_table()
+    password_db.create_mamba_password_vault_table()
+
+    rng = random.Random(seed_value)
+    for user in range(users):
+        username = f"benchuser{user}"
+        account_db.create_mamba_account(username, BENCH_PASSWORD, f"+44{user:010d}")
+        password_db.generate_master_key(username)
+        count = size if user == 0 else other_entries
+        password_db.add_passwords(
+            username,
+            ((f"site{i}.example.com", f"password-{rng.getrandbits(64):016x}") for i in range(count)),
+        )
+
+    return account_db, password_db, "benchuser0"
+
+
+def bench_size(size, args):
+    """This function seeds a vault of the given size and times each of the vault's hot paths against it.
+
+    Returns:
+        dict: The summary of each operation, keyed by its name
+    """
+    seed_start = time.perf_counter()
+    account_db, password_db, username = seed(size, args.users, args.other_entries, args.seed)
+    seed_seconds = time.perf_counter() - seed_start
+    password_db.unlock_vault(username)
+    # every operation is measured with the vault unlocked, as it is once the user has logged in
+
+    rng = random.Random(args.seed)
+    existing = [f"site{rng.randrange(size)}.example.com" for _ in range(args.ops)]
+    added = [f"new{i}.example.com" for i in range(args.ops)]
+    export_path = os.path.join(os.getcwd(), "export.json")
+
+    results = {
+        "add_password": timed(
+            password_db.add_password, ((username, website, "new-password") for website in added)
+        ),
+        "update_password": timed(
+            password_db.update_password, ((username, website, f"updated-{i}") for i, website in enumerate(existing))
+        ),
+        "website_exists": timed(
+            password_db.website_exists,
+            ((username, website) for pair in zip(existing, added) for website in pair),
+        ),
+        "delete_password": timed(
+            password_db.delete_password, ((username, website) for website in added)
+        ),
+        # the added entries are deleted again, so the full vault operations see the seeded size
+        "view_passwords": timed(password_db.view_passwords, [(username,)] * args.scan_runs),
+        "export_passwords": timed(password_db.export_passwords, [(username, export_path)] * args.scan_runs),
+    }
+
+    password_db.pool.close_all()
+    account_db.pool.close_all()
+    os.chdir(BENCH_DIR)
+    return {
+        "entries": size,
+        "seed_seconds": seed_seconds,
+        "operations": {name: summarise(latencies) for name, latencies in results.items()},
+    }
+
+
+def main():
+    """This function benchmarks the hot paths of 'MambaPasswordVaultDB' at several vault sizes and writes the ops/sec and p50/p99 latency
+    of each operation to a JSON file, so runs can be compared to catch regressions."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=VAULT_SIZES)
+    parser.add_argument("--ops", type=int, default=500, help="the number of calls timed for each single entry operation")
+    parser.add_argument("--scan-runs", type=int, default=3, help="the number of calls timed for view_passwords and export_passwords")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--other-entries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_vault_operations.json")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    report = {
+        "benchmark": "vault_operations",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": [],
+    }
+
+    print(f"{'entries':>9}  {'operation':<18}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for size in args.sizes:
+        result = bench_size(size, args)
+        report["results"].append(result)
+        for name, summary in result["operations"].items():
+            print(f"{size:>9}  {name:<18}{summary['ops_per_sec']:>10.1f}{summary['p50_ms']:>10.3f}{summary['p99_ms']:>10.3f}")
+
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        # the report is rewritten after every size, so the results of the smaller sizes are kept if a large run is stopped
+
+    print(f"wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Mamba Password Manager - Vault Sharding Benchmark
+
+# Modules
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# runs against throwaway database files so the real vault is never touched
+BENCH_DIR = tempfile.mkdtemp(prefix="mamba_bench_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mamba_database_registry import MambaDatabaseRegistry
+
+# Constants
+SHARD_MODES = ["single", "user", "4"]
+
+
+def bench_mode(mode, users, ops):
+    """This function times concurrent writers, one thread per user, each adding passwords to their own vault.
+
+    Returns:
+        float: The number of passwords added per second across all threads
+    """
+    os.makedirs(os.path.join(BENCH_DIR, mode))
+    os.chdir(os.path.join(BENCH_DIR, mode))
+    registry = MambaDatabaseRegistry(shards=None if mode == "single" else int(mode) if mode.isdigit() else mode)
+    registry.create_tables()
+    account_db = registry.get_account_db()
+    password_db = registry.get_password_vault_db()
+
+    usernames = [f"benchuser{user}" for user in range(users)]
+    for user, username in enumerate(usernames):
+        account_db.create_mamba_account(username, "BenchPassw0rd", f"+44{user:010d}")
+        password_db.generate_master_key(username)
+        password_db.unlock_vault(username)
+
+    def writer(username):
+        for i in range(ops):
+            password_db.add_password(username, f"site{i}.example.com", "password")
+
+    threads = [threading.Thread(target=writer, args=(username,)) for username in usernames]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    registry.close_all()
+    os.chdir(BENCH_DIR)
+    return users * ops / elapsed
+
+
+def main():
+    """This function compares write throughput with concurrent users between a single vault file, a vault file per user, and hash
+    partitioned vault files."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=SHARD_MODES)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'writes/s':>12}")
+    for mode in args.modes:
+        print(f"{mode:<10}{bench_mode(mode, args.users, args.ops):>12.0f}")
+    print(f"{os.cpu_count()} CPU cores")
+
+
+if __name__ == "__main__":
+    main()
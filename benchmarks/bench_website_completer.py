@@ -0,0 +1,38 @@
+# Mamba Password Manager - Website Completer Benchmark
+
+# Modules
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mamba_website_completer import MambaWebsiteCompleter
+
+
+def main():
+    """This function builds website completers of increasing size and prints their build time, memory footprint and completion latency."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'websites':>10}{'build ms':>12}{'memory MB':>12}{'complete us':>14}")
+    for size in (1000, 10000, 100000):
+        websites = [f"site{i}.example{i % 100}.com" for i in range(size)]
+        prefixes = [f"site{i}" for i in range(0, size, max(size // args.lookups, 1))][: args.lookups]
+
+        start = time.perf_counter()
+        completer = MambaWebsiteCompleter(websites)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for prefix in prefixes:
+            completer.complete(prefix)
+        complete = (time.perf_counter() - start) / len(prefixes)
+
+        print(f"{size:>10}{build * 1000:>12.1f}{completer.memory_usage() / 1e6:>12.2f}{complete * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# Mamba Password Manager - Import Time Check
+
+# Modules
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the module Mamba is started from, and the heavy modules which must only be imported when their feature is first used
+ENTRY_MODULE = "main"
+DEFERRED_MODULES = ["twilio", "requests", "pyperclip", "mamba_main_gui"]
+IMPORT_BUDGET_MS = 150
+
+
+def module_imports(tree):
+    """This function lists the modules a module imports when it is loaded. Imports inside functions only run when the function is
+    called, so they are left out, while imports inside module level 'if', 'try' and 'with' blocks and class bodies are included.
+
+    Args:
+        tree (ast.Module): The parsed module
+
+    Returns:
+        list: The full names of the modules imported
+    """
+    imports = []
+    nodes = list(tree.body)
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.append(node.module)
+        else:
+            nodes.extend(ast.iter_child_nodes(node))
+    return imports
+
+
+def startup_graph(entry=ENTRY_MODULE):
+    """This function follows the imports made while Mamba starts up, beginning with the entry module, by reading the source of every
+    Mamba module reached. It doesn't import anything, so it works even where the GUI dependencies aren't installed.
+
+    Args:
+        entry (str): The module Mamba is started from
+
+    Returns:
+        dict: The modules imported while starting up, keyed by their top level name, with the Mamba module which first imports each one
+    """
+    graph = {entry: None}
+    pending = [entry]
+    while pending:
+        module = pending.pop()
+        with open(os.path.join(ROOT, f"{module}.py"), encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for name in module_imports(tree):
+            top = name.split(".")[0]
+            if top in graph:
+                continue
+            graph[top] = module
+            if os.path.exists(os.path.join(ROOT, f"{top}.py")):
+                pending.append(top)
+            # only Mamba's own modules are followed, third party packages are recorded but not read
+    return graph
+
+
+def import_times(module):
+    """This function imports a module in a fresh interpreter with 'python -X importtime' and parses the time taken by every module imported.
+
+    Args:
+        module (str): The module to import
+
+    Returns:
+        dict: The cumulative import time of each module imported, in milliseconds, keyed by its full name
+    """
+    code = f"import sys; sys.path.insert(0, {ROOT!r}); import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr.splitlines()[-1]}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    # each line is 'import time: self | cumulative | name', with the name indented by its depth, in microseconds
+    return times
+
+
+def main():
+    """This function checks that starting Mamba doesn't import any of the deferred modules, both by following the imports in the source
+    from 'main.py' and by importing it, and that importing it takes less than the time budget. It exits with a non-zero status if any
+    check fails, so it can be run as a regression check."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS, help="the maximum total import time in milliseconds")
+    args = parser.parse_args()
+
+    graph = startup_graph()
+    failures = [
+        f"{module} is imported at start up by {graph[module]}" for module in DEFERRED_MODULES if module in graph
+    ]
+    # the source check catches a deferred import moved back to the top of a module, even where the dependencies aren't installed
+
+    try:
+        times = import_times(ENTRY_MODULE)
+    except RuntimeError as error:
+        times = None
+        failures.append(str(error))
+    # importing 'main' doesn't open any windows, as the GUI is only started when it is run as a script
+
+    if times is not None:
+        failures.extend(
+            f"{module} is imported at start up ({times[module]:.1f} ms)"
+            for module in DEFERRED_MODULES
+            if module in times and module not in graph
+        )
+        total = times.get(ENTRY_MODULE, 0)
+        if total > args.budget:
+            failures.append(f"start up imports took {total:.1f} ms, over the budget of {args.budget:.0f} ms")
+
+        print(f"{'module':<32}{'ms':>10}")
+        for module in graph:
+            if module in times:
+                print(f"{module:<32}{times[module]:>10.1f}")
+        print(f"{'total':<32}{total:>10.1f}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,31 +2,66 @@
 
 # Modules
 import bcrypt
-import sqlite3
 import uuid
 import time
-from twilio.rest import Client
 import random
 import datetime
+from mamba_database_connection import MambaConnectionPool, DEFAULT_PROFILE, group_committed
+from mamba_schema_migrations import MambaMigration, MambaMigrationRunner
 
 
 # Mamba Password Manager - Account Database Class
 class MambaAccountDB:
-    def __init__(self):
+    def __init__(self, profile=DEFAULT_PROFILE, group_commit=None):
         """This function initialises the 'MambaAccountDB' class and it's attributes,  and to enable a connection with the database
-        to allow manipulation of the user data. It connects to the 'mamba_userdata.db' database file, and assigns the cursor object to the 'cur'
-        attribute to enable execution of SQL statements."""
+        to allow manipulation of the user data. It creates a pool of connections to the 'mamba_userdata.db' database file, where every thread
+        gets its own connection, and each operation creates its own short-lived cursor to execute SQL statements.
 
-        # establishes a connection to the database
-        self.conn = sqlite3.connect("mamba_userdata.db")
-        # cursor is created to allow for querying the database
-        self.cur = self.conn.cursor()
+        Args:
+            profile (str): The connection profile used to tune the database connection, either 'safe' or 'fast'
+            group_commit (MambaGroupCommit): The group commit settings for login attempt updates, or None to commit each of them straight away
+        """
+
+        # creates a pool of tuned connections to the database
+        self.pool = MambaConnectionPool("mamba_userdata.db", profile, group_commit=group_commit)
+
+    @property
+    def conn(self):
+        """This property retrieves the current thread's connection to the database from the connection pool."""
+        return self.pool.get_connection()
+
+    def flush(self):
+        """This function commits every write left pending by group commit."""
+        self.pool.flush()
+
+    def close_all(self):
+        """This function closes every connection opened by the database, and is called when the application closes."""
+        self.pool.close_all()
 
     def create_mamba_account_table(self):
-        """This function creates the 'mamba_userdata' table if it doesn't already exist. This table will store account details for each user."""
+        """This function creates the 'mamba_userdata' table if it doesn't already exist. This table will store account details for each user.
+        Account databases created by older versions are upgraded to the latest schema by running the migrations they haven't had yet."""
+
+        MambaMigrationRunner(self.get_migrations()).migrate(self.conn)
+
+    def get_migrations(self):
+        """This function lists the migrations which build the account database's schema, one per schema version. New schema changes are
+        added as a new migration with the next version, and existing migrations are never changed once released.
+
+        Returns:
+            list: Returns the 'MambaMigration' steps
+        """
+        return [MambaMigration(1, "create the mamba_userdata table", self.create_userdata_table)]
+
+    def create_userdata_table(self, cur):
+        """This function creates the 'mamba_userdata' table if it doesn't already exist.
+
+        Args:
+            cur (sqlite3.Cursor): The cursor used to create the table
+        """
 
         # account database is created with required fields
-        self.cur.execute(
+        cur.execute(
             """
         CREATE TABLE IF NOT EXISTS mamba_userdata (
         id INTEGER PRIMARY KEY,
@@ -57,6 +92,8 @@ class MambaAccountDB:
         mamba_account_username = username
         mamba_account_password = password
         mamba_account_phone_number = phone_number
+        cur = self.conn.cursor()
+        # cursor is created to allow for querying the database
 
         if len(mamba_account_password) < 8:
             return False
@@ -71,7 +108,7 @@ class MambaAccountDB:
             return False
         # verifies if user's entered password has a digit
         else:
-            self.cur.execute(
+            cur.execute(
                 "SELECT * FROM mamba_userdata WHERE mamba_account_username=? OR mamba_account_phone_number=?",
                 (
                     mamba_account_username,
@@ -80,7 +117,7 @@ class MambaAccountDB:
             )
         # selects all fields within 'mamba_userdata' to store the data
 
-        row = self.cur.fetchone()
+        row = cur.fetchone()
         # retrives the next row of the query result from 'mamba_userdata'
 
         if row is None:
@@ -91,7 +128,7 @@ class MambaAccountDB:
             # hashes the password inputted by user with a salt of 12 rounds
             mamba_account_unique_id = str(uuid.uuid4())
             # generates a unique id for each account that is entered into 'mamba_userdata'
-            self.cur.execute(
+            cur.execute(
                 "INSERT INTO mamba_userdata (mamba_account_username, mamba_account_password, mamba_account_login_attempts, mamba_account_last_login_attempt, mamba_account_unique_id, mamba_account_phone_number) VALUES (?, ?, ?, ?, ?, ?)",
                 (
                     mamba_account_username,
@@ -109,6 +146,7 @@ class MambaAccountDB:
         else:
             return False
 
+    @group_committed
     def mamba_account_login(self, username, password):
         """This function allows a user to login to their Mamba account providing they have entered their correct account details, which
         are retrieved from the 'mamba_userdata' database, then logging them in if successful.
@@ -124,14 +162,15 @@ class MambaAccountDB:
 
         mamba_account_username = username
         mamba_account_password = password
+        cur = self.conn.cursor()
 
-        self.cur.execute(
+        cur.execute(
             "SELECT mamba_account_password, mamba_account_login_attempts, mamba_account_last_login_attempt FROM mamba_userdata WHERE mamba_account_username = ?",
             (mamba_account_username,),
         )
         # selects the user's account password, login attempt and last login attempt from 'mamba_userdata'
 
-        row = self.cur.fetchone()
+        row = cur.fetchone()
         # retrives the next row of the query result from 'mamba_userdata'
 
         if row is not None:
@@ -149,23 +188,23 @@ class MambaAccountDB:
             elif bcrypt.checkpw(
                 mamba_account_password.encode(), mamba_account_hashed_password.encode()
             ):
-                self.cur.execute(
+                cur.execute(
                     "UPDATE mamba_userdata SET mamba_account_login_attempts = 0 WHERE mamba_account_username = ?",
                     (mamba_account_username,),
                 )
-                self.conn.commit()
+                self.pool.commit()
                 return True
             # if successful, the login attempt and last login attempt values are reset, and the user is logged in, commiting changes in the database
             else:
                 datetime = datetime.datetime.fromtimestamp(time.time()).strftime("%c")
-                self.cur.execute(
+                cur.execute(
                     "UPDATE mamba_userdata SET mamba_account_login_attempts = mamba_account_login_attempts + 1, mamba_account_last_login_attempt = ? WHERE mamba_account_username = ?",
                     (
                         datetime,
                         mamba_account_username,
                     ),
                 )
-                self.conn.commit()
+                self.pool.commit()
                 return False
             # updates the last login attempt and number of login attempts if user fails to enter correct details
         else:
@@ -182,14 +221,17 @@ class MambaAccountDB:
             Boolean: When True, the function ends and the changes in the database are saved.
         """
         mamba_account_username = username
+        cur = self.conn.cursor()
 
-        self.cur.execute(
+        cur.execute(
             "UPDATE mamba_userdata SET mamba_account_login_attempts = 0, mamba_account_last_login_attempt = 0 WHERE mamba_account_username = ? ",
             (mamba_account_username,),
         )
         # resets the last login attempt and number of login attempts to 0, logging user out
 
         self.conn.commit()
+        self.pool.flush()
+        # logging out commits every login attempt update left pending by group commit
 
         return True
 
@@ -210,16 +252,16 @@ class MambaAccountDB:
         mamba_account_password = password
 
         # creates cursor to query database
-        self.conn.cursor()
+        cur = self.conn.cursor()
 
         # checks if username exists in database
-        self.cur.execute(
+        cur.execute(
             "SELECT mamba_account_password FROM mamba_userdata WHERE mamba_account_username = ?",
             (mamba_account_username,),
         )
 
         # stores query result as a list
-        result = self.cur.fetchone()
+        result = cur.fetchone()
 
         if result is None:
             return False
@@ -232,11 +274,11 @@ class MambaAccountDB:
             return False
         # returns False if the password entered doesn't match the password within the database
 
-        self.cur.execute(
+        cur.execute(
             "SELECT mamba_account_phone_number FROM mamba_userdata WHERE mamba_account_username = ?",
             (username,),
         )
-        mamba_account_phone_number = self.cur.fetchone()[0]
+        mamba_account_phone_number = cur.fetchone()[0]
         # retrieves the phone number associated to the user's account username
 
         two_fa_code = random.randint(100000, 999999)
@@ -244,6 +286,8 @@ class MambaAccountDB:
 
         account_sid = "YOUR_SID"
         auth_token = "YOUR_TOKEN"
+        from twilio.rest import Client
+        # twilio is only imported when a 2FA code is sent, as importing it takes longer than the rest of the start up
         client = Client(account_sid, auth_token)
         # twilio account details required to connect to the module, client class from twilio.rest is instantiated
         client.messages.create(
@@ -257,7 +301,7 @@ class MambaAccountDB:
         user_two_fa_code = input("Enter code: ")
 
         if user_two_fa_code == str(two_fa_code):
-            self.cur.execute(
+            cur.execute(
                 "DELETE FROM mamba_userdata WHERE mamba_account_username = ?",
                 (mamba_account_username,),
             )
@@ -283,22 +327,22 @@ class MambaAccountDB:
         mamba_account_username = username
         mamba_account_new_password = new_password
 
-        self.conn.cursor()
-        self.cur.execute(
+        cur = self.conn.cursor()
+        cur.execute(
             "SELECT mamba_account_password FROM mamba_userdata WHERE mamba_account_username = ?",
             (mamba_account_username,),
         )
-        result = self.cur.fetchone()
+        result = cur.fetchone()
 
         if result is None:
             return False
         # returns False if the username entered doesn't exist within the database
 
-        self.cur.execute(
+        cur.execute(
             "SELECT mamba_account_phone_number FROM mamba_userdata WHERE mamba_account_username = ?",
             (username,),
         )
-        mamba_account_phone_number = self.cur.fetchone()[0]
+        mamba_account_phone_number = cur.fetchone()[0]
         # retrieves the phone number associated to the user's account username
 
         two_fa_code = random.randint(100000, 999999)
@@ -306,6 +350,8 @@ class MambaAccountDB:
 
         account_sid = "YOUR_SID"
         auth_token = "YOUR_TOKEN"
+        from twilio.rest import Client
+        # twilio is only imported when a 2FA code is sent, as importing it takes longer than the rest of the start up
         client = Client(account_sid, auth_token)
 
         client.messages.create(
@@ -325,7 +371,7 @@ class MambaAccountDB:
             ).decode()
             # if the entered 2FA code matches, and hashes the new password
 
-            self.cur.execute(
+            cur.execute(
                 "UPDATE mamba_userdata SET mamba_account_password = ? WHERE mamba_account_username = ?",
                 (mamba_account_new_password_hash, mamba_account_username),
             )
@@ -341,6 +387,12 @@ class MambaAccountDB:
             # returns False if the 2FA code entered doesn't match the one sent
 
 
-# instantiate the 'MambaAccountDB' class object
-account_db = MambaAccountDB()
+def __getattr__(name):
+    """This function resolves the module's 'account_db' object to the shared account database in the registry the first time it is
+    used, so importing this module doesn't create a database object."""
+    if name == "account_db":
+        from mamba_database_registry import get_account_db
+
+        return get_account_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
@@ -0,0 +1,255 @@
+# Mamba Password Manager - Async Database
+
+# Modules
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from mamba_database_registry import get_account_db, get_password_vault_db
+from mamba_password_vault_database import VIEW_PAGE_SIZE, SEARCH_LIMIT
+
+# Constants
+ASYNC_MAX_WORKERS = 4
+
+
+# Mamba Password Manager - Async Database Base Class
+class AsyncMambaDB:
+    def __init__(self, db, max_workers=ASYNC_MAX_WORKERS, timeout=None):
+        """This function initialises the 'AsyncMambaDB' class, which runs the blocking methods of a database class on a bounded pool of
+        worker threads so they can be awaited from asyncio code without blocking the event loop.
+
+        Args:
+            db (object): The database object whose methods are run on the worker threads
+            max_workers (int): The maximum number of database, bcrypt and Fernet operations which can run at the same time
+            timeout (float): The default number of seconds to wait for an operation, or None to wait forever
+        """
+        self.db = db
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=type(self).__name__
+        )
+        # each worker thread gets its own connection from the database's connection pool
+
+    async def run(self, function, *args, timeout=None, **kwargs):
+        """This function runs a blocking function on the worker threads and waits for its result.
+
+        If the coroutine is cancelled or times out, the caller stops waiting straight away, but the worker thread finishes the operation
+        in the background, as a running SQLite statement or bcrypt hash can't be interrupted part way through.
+
+        Args:
+            function (callable): The blocking function to run
+            args: The arguments passed to the function
+            timeout (float): The number of seconds to wait, which defaults to the timeout given when the class was created
+            kwargs: The keyword arguments passed to the function
+
+        Raises:
+            asyncio.TimeoutError: Raises a timeout error if the operation takes longer than the timeout
+
+        Returns:
+            object: Returns the result of the function
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor, functools.partial(function, *args, **kwargs)
+        )
+        return await asyncio.wait_for(
+            future, timeout if timeout is not None else self.timeout
+        )
+
+    def close(self):
+        """This function shuts down the worker threads once any running operations have finished."""
+        self.executor.shutdown()
+
+
+# Mamba Password Manager - Async Account Database Class
+class AsyncMambaAccountDB(AsyncMambaDB):
+    def __init__(self, db=None, max_workers=ASYNC_MAX_WORKERS, timeout=None):
+        """This function initialises the 'AsyncMambaAccountDB' class, an awaitable version of 'MambaAccountDB'.
+
+        Args:
+            db (MambaAccountDB): The account database to wrap, which defaults to the shared account database
+            max_workers (int): The maximum number of operations which can run at the same time
+            timeout (float): The default number of seconds to wait for an operation, or None to wait forever
+        """
+        super().__init__(db or get_account_db(), max_workers, timeout)
+
+    async def create_mamba_account_table(self, timeout=None):
+        """This function awaits 'MambaAccountDB.create_mamba_account_table'."""
+        return await self.run(self.db.create_mamba_account_table, timeout=timeout)
+
+    async def create_mamba_account(self, username, password, phone_number, timeout=None):
+        """This function awaits 'MambaAccountDB.create_mamba_account'."""
+        return await self.run(
+            self.db.create_mamba_account, username, password, phone_number, timeout=timeout
+        )
+
+    async def mamba_account_login(self, username, password, timeout=None):
+        """This function awaits 'MambaAccountDB.mamba_account_login'."""
+        return await self.run(
+            self.db.mamba_account_login, username, password, timeout=timeout
+        )
+
+    async def mamba_account_logout(self, username, timeout=None):
+        """This function awaits 'MambaAccountDB.mamba_account_logout'."""
+        return await self.run(self.db.mamba_account_logout, username, timeout=timeout)
+
+    async def delete_mamba_account(self, username, password, timeout=None):
+        """This function awaits 'MambaAccountDB.delete_mamba_account', including sending the 2FA code."""
+        return await self.run(
+            self.db.delete_mamba_account, username, password, timeout=timeout
+        )
+
+    async def change_mamba_account_password(self, username, new_password, timeout=None):
+        """This function awaits 'MambaAccountDB.change_mamba_account_password', including sending the 2FA code."""
+        return await self.run(
+            self.db.change_mamba_account_password, username, new_password, timeout=timeout
+        )
+
+
+# Mamba Password Manager - Async Password Vault Database Class
+class AsyncMambaPasswordVaultDB(AsyncMambaDB):
+    def __init__(self, db=None, max_workers=ASYNC_MAX_WORKERS, timeout=None):
+        """This function initialises the 'AsyncMambaPasswordVaultDB' class, an awaitable version of 'MambaPasswordVaultDB'.
+
+        Args:
+            db (MambaPasswordVaultDB): The password vault database to wrap, which defaults to the shared password vault database
+            max_workers (int): The maximum number of operations which can run at the same time
+            timeout (float): The default number of seconds to wait for an operation, or None to wait forever
+        """
+        super().__init__(db or get_password_vault_db(), max_workers, timeout)
+
+    async def create_mamba_password_vault_table(self, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.create_mamba_password_vault_table'."""
+        return await self.run(self.db.create_mamba_password_vault_table, timeout=timeout)
+
+    async def generate_master_key(self, username, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.generate_master_key'."""
+        return await self.run(self.db.generate_master_key, username, timeout=timeout)
+
+    async def rotate_master_key(self, username, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.rotate_master_key'. If it times out or is cancelled, the rotation carries on in the
+        background and can be resumed by calling it again."""
+        return await self.run(self.db.rotate_master_key, username, timeout=timeout)
+
+    async def unlock_vault(self, username, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.unlock_vault'."""
+        return await self.run(self.db.unlock_vault, username, timeout=timeout)
+
+    def lock_vault(self, username):
+        """This function calls 'MambaPasswordVaultDB.lock_vault', which doesn't block so doesn't need to be awaited."""
+        return self.db.lock_vault(username)
+
+    def reveal_cache_stats(self):
+        """This function calls 'MambaPasswordVaultDB.reveal_cache_stats', which doesn't block so doesn't need to be awaited."""
+        return self.db.reveal_cache_stats()
+
+    async def add_password(self, username, website, password, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.add_password'."""
+        return await self.run(
+            self.db.add_password, username, website, password, timeout=timeout
+        )
+
+    async def add_passwords(self, username, entries, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.add_passwords'."""
+        return await self.run(self.db.add_passwords, username, entries, timeout=timeout)
+
+    async def import_passwords(self, username, file_path, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.import_passwords'."""
+        return await self.run(
+            self.db.import_passwords, username, file_path, timeout=timeout
+        )
+
+    async def view_passwords(self, username, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.view_passwords'."""
+        return await self.run(self.db.view_passwords, username, timeout=timeout)
+
+    async def iter_passwords(self, username, page_size=VIEW_PAGE_SIZE, after_id=0, timeout=None):
+        """This function is the async version of 'MambaPasswordVaultDB.iter_passwords'. Each page is read and decrypted on a worker thread,
+        and the timeout applies to each page rather than the whole vault.
+
+        Yields:
+            dict: A dictionary containing the id, website and decrypted password of each entry
+        """
+        async for entry in self.iter_pages(self.db.iter_passwords, username, page_size, after_id, timeout):
+            yield entry
+
+    async def list_passwords(self, username, page_size=VIEW_PAGE_SIZE, after_id=0, timeout=None):
+        """This function is the async version of 'MambaPasswordVaultDB.list_passwords'. Each page is read on a worker thread, and the timeout
+        applies to each page rather than the whole vault.
+
+        Yields:
+            dict: A dictionary containing the id, website, created_at and updated_at of each entry
+        """
+        async for entry in self.iter_pages(self.db.list_passwords, username, page_size, after_id, timeout):
+            yield entry
+
+    async def iter_pages(self, generator, username, page_size, after_id, timeout):
+        """This function reads one of the vault's paged generators a page at a time on the worker threads, resuming each page after the last
+        id of the previous one so no generator is shared between threads.
+
+        Args:
+            generator (callable): Either 'iter_passwords' or 'list_passwords'
+            username (str): The username associated to the user's Mamba account
+            page_size (int): The number of entries read per page
+            after_id (int): Only entries with an id greater than this are yielded
+            timeout (float): The number of seconds to wait for each page
+
+        Yields:
+            dict: Each entry yielded by the generator
+        """
+        while True:
+            page = await self.run(
+                lambda: list(
+                    itertools.islice(generator(username, page_size, after_id), page_size)
+                ),
+                timeout=timeout,
+            )
+            for entry in page:
+                yield entry
+
+            if len(page) < page_size:
+                break
+            after_id = page[-1]["id"]
+
+    async def search(self, username, query, limit=SEARCH_LIMIT, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.search'."""
+        return await self.run(self.db.search, username, query, limit, timeout=timeout)
+
+    async def reveal(self, username, entry_id, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.reveal'."""
+        return await self.run(self.db.reveal, username, entry_id, timeout=timeout)
+
+    async def update_password(self, username, website, new_password, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.update_password'."""
+        return await self.run(
+            self.db.update_password, username, website, new_password, timeout=timeout
+        )
+
+    async def view_password_history(self, username, website, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.view_password_history'."""
+        return await self.run(
+            self.db.view_password_history, username, website, timeout=timeout
+        )
+
+    async def prune_history(self, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.prune_history'."""
+        return await self.run(self.db.prune_history, timeout=timeout)
+
+    async def delete_password(self, username, website, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.delete_password'."""
+        return await self.run(self.db.delete_password, username, website, timeout=timeout)
+
+    async def website_exists(self, username, website, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.website_exists'."""
+        return await self.run(self.db.website_exists, username, website, timeout=timeout)
+
+    async def export_passwords(self, username, file_path=None, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.export_passwords'."""
+        return await self.run(
+            self.db.export_passwords, username, file_path, timeout=timeout
+        )
+
+    async def sync(self, other_db_path, timeout=None):
+        """This function awaits 'MambaPasswordVaultDB.sync'. If it times out or is cancelled, the sync carries on in the background, and
+        any batches already committed aren't exchanged again by the next sync."""
+        return await self.run(self.db.sync, other_db_path, timeout=timeout)
@@ -0,0 +1,175 @@
+# Mamba Password Manager - Crypto Engine
+
+# Modules
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from cryptography.fernet import Fernet, MultiFernet
+
+# Constants
+CRYPTO_CHUNK_SIZE = 64
+
+
+def make_fernet(key):
+    """This function creates the Fernet object for a master key, or a MultiFernet object for a list of master keys while a key rotation is
+    in progress, which encrypts with the first key and decrypts with any of them.
+
+    Args:
+        key (bytes or list): The user's master key, or a list of master keys with the newest first
+
+    Returns:
+        Fernet: Returns the Fernet or MultiFernet object
+    """
+    if isinstance(key, (list, tuple)):
+        return MultiFernet([Fernet(k) for k in key])
+    return Fernet(key)
+
+
+def encrypt_chunk(key, plaintexts):
+    """This function encrypts a chunk of passwords with the given master key. It is kept at module level so it can be sent to worker processes.
+
+    Args:
+        key (bytes or list): The user's master key, or a list of master keys with the newest first
+        plaintexts (list): The passwords to encrypt
+
+    Returns:
+        list: Returns the encrypted passwords in the same order
+    """
+    fernet = make_fernet(key)
+    return [fernet.encrypt(plaintext.encode()) for plaintext in plaintexts]
+
+
+def decrypt_chunk(key, tokens):
+    """This function decrypts a chunk of encrypted passwords with the given master key. It is kept at module level so it can be sent to
+    worker processes.
+
+    Args:
+        key (bytes or list): The user's master key, or a list of master keys with the newest first
+        tokens (list): The encrypted passwords to decrypt
+
+    Returns:
+        list: Returns the decrypted passwords in the same order
+    """
+    fernet = make_fernet(key)
+    return [fernet.decrypt(token).decode() for token in tokens]
+
+
+def rotate_chunk(keys, tokens):
+    """This function re-encrypts a chunk of encrypted passwords with the newest of the given master keys, without the passwords leaving
+    the worker as plain text. It is kept at module level so it can be sent to worker processes.
+
+    Args:
+        keys (list): The user's master keys with the newest first
+        tokens (list): The encrypted passwords to re-encrypt
+
+    Returns:
+        list: Returns the re-encrypted passwords in the same order
+    """
+    fernet = make_fernet(keys)
+    return [fernet.rotate(token) for token in tokens]
+
+
+# Mamba Password Manager - Crypto Engine Class
+class MambaCryptoEngine:
+    def __init__(self, executor="thread", workers=None, chunk_size=CRYPTO_CHUNK_SIZE):
+        """This function initialises the 'MambaCryptoEngine' class, which spreads bulk encryption and decryption across a pool of workers.
+        Work is split into chunks and the results are always returned in the same order as the input.
+
+        Args:
+            executor (str): Either 'thread' for a thread pool, or 'process' for a process pool
+            workers (int): The number of workers in the pool, which defaults to the number of CPU cores
+            chunk_size (int): The number of passwords in each unit of work sent to a worker
+        """
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}, use 'thread' or 'process'")
+
+        self.executor_type = executor
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.executor = None
+        # the pool is only started the first time a large batch is processed
+
+    def get_executor(self):
+        """This function retrieves the engine's worker pool, starting it if it hasn't been started yet.
+
+        Returns:
+            Executor: Returns the thread or process pool
+        """
+        if self.executor is None:
+            if self.executor_type == "process":
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def run(self, function, key, items):
+        """This function applies an encrypt or decrypt function to a list of items in chunks, running the chunks on the worker pool when
+        there is more than one of them.
+
+        Args:
+            function (callable): Either 'encrypt_chunk', 'decrypt_chunk' or 'rotate_chunk'
+            key (bytes or list): The user's master key, or a list of master keys with the newest first
+            items (list): The passwords or encrypted passwords to process
+
+        Returns:
+            list: Returns the processed items in the same order as the input
+        """
+        items = list(items)
+
+        if not items:
+            return []
+        # an empty page has nothing to process, and may come from a user who has no master key yet
+
+        if self.workers == 1 or len(items) <= self.chunk_size:
+            return function(key, items)
+        # small batches are processed in the calling thread, as starting work on the pool would cost more than it saves
+
+        chunks = [
+            items[i : i + self.chunk_size] for i in range(0, len(items), self.chunk_size)
+        ]
+        results = []
+        for chunk in self.get_executor().map(function, [key] * len(chunks), chunks):
+            results.extend(chunk)
+        # 'map' returns the chunks in the order they were submitted
+        return results
+
+    def encrypt_many(self, key, plaintexts):
+        """This function encrypts many passwords with the given master key.
+
+        Args:
+            key (bytes or list): The user's master key, or a list of master keys with the newest first
+            plaintexts (iterable): The passwords to encrypt
+
+        Returns:
+            list: Returns the encrypted passwords in the same order
+        """
+        return self.run(encrypt_chunk, key, plaintexts)
+
+    def decrypt_many(self, key, tokens):
+        """This function decrypts many encrypted passwords with the given master key.
+
+        Args:
+            key (bytes or list): The user's master key, or a list of master keys with the newest first
+            tokens (iterable): The encrypted passwords to decrypt
+
+        Returns:
+            list: Returns the decrypted passwords in the same order
+        """
+        return self.run(decrypt_chunk, key, tokens)
+
+    def rotate_many(self, keys, tokens):
+        """This function re-encrypts many encrypted passwords with the newest of the given master keys.
+
+        Args:
+            keys (list): The user's master keys with the newest first
+            tokens (iterable): The encrypted passwords to re-encrypt
+
+        Returns:
+            list: Returns the re-encrypted passwords in the same order
+        """
+        return self.run(rotate_chunk, keys, tokens)
+
+    def close(self):
+        """This function shuts down the worker pool if it has been started."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,319 @@
+# Mamba Password Manager - Database Connection Factory
+
+# Modules
+import functools
+import sqlite3
+import threading
+import weakref
+
+# Constants
+CONNECTION_PROFILES = {
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8000,
+        "mmap_size": 67108864,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,
+        "mmap_size": 268435456,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+}
+DEFAULT_PROFILE = "safe"
+# 'safe' syncs every commit to disk, 'fast' only syncs at WAL checkpoints, so a power cut may lose the last few commits but never corrupts the file
+GROUP_COMMIT_MAX_OPS = 100
+GROUP_COMMIT_WINDOW = 0.05
+
+
+def apply_profile(conn, profile=DEFAULT_PROFILE, schema="main"):
+    """This function applies the pragmas of a connection profile to a database on an open connection.
+
+    Args:
+        conn (sqlite3.Connection): The connection to tune
+        profile (str): The name of the profile in 'CONNECTION_PROFILES'
+        schema (str): The name of the database on the connection to tune, such as 'main' or the name of an attached database
+
+    Raises:
+        ValueError: Raises a value error if the profile doesn't exist
+    """
+    if profile not in CONNECTION_PROFILES:
+        raise ValueError(f"Unknown connection profile: {profile}, use one of {list(CONNECTION_PROFILES)}")
+
+    settings = CONNECTION_PROFILES[profile]
+    conn.execute(f"PRAGMA busy_timeout = {settings['busy_timeout']}")
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+    # busy_timeout and temp_store apply to the whole connection
+    for pragma in ("journal_mode", "synchronous", "cache_size", "mmap_size"):
+        conn.execute(f"PRAGMA {schema}.{pragma} = {settings[pragma]}")
+    # the remaining pragmas apply to each database on the connection
+
+
+def connect(path, profile=DEFAULT_PROFILE, **kwargs):
+    """This function opens a connection to a database file and tunes it with a connection profile. WAL journaling lets readers carry on
+    while another connection is writing, and commits only append to the WAL file instead of rewriting the rollback journal.
+
+    Args:
+        path (str): The path of the database file
+        profile (str): The name of the profile in 'CONNECTION_PROFILES'
+        kwargs: Any other arguments are passed on to 'sqlite3.connect'
+
+    Returns:
+        sqlite3.Connection: Returns the tuned connection
+    """
+    conn = sqlite3.connect(path, **kwargs)
+    apply_profile(conn, profile)
+    return conn
+
+
+def attach(conn, path, schema, profile=DEFAULT_PROFILE):
+    """This function attaches another database file to an open connection and tunes it with the same connection profile.
+
+    Args:
+        conn (sqlite3.Connection): The connection to attach the database to
+        path (str): The path of the database file to attach
+        schema (str): The name the attached database is given on the connection
+        profile (str): The name of the profile in 'CONNECTION_PROFILES'
+    """
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+    apply_profile(conn, profile, schema)
+
+
+def group_committed(method):
+    """This decorator is used on the database methods which write through 'MambaConnectionPool.commit'. When group commit is on, the
+    method holds its connection's write lock while it runs, so a background flush never commits half of its statements. When group
+    commit is off, the method is called directly.
+
+    Args:
+        method (callable): The database method to wrap
+
+    Returns:
+        callable: Returns the wrapped method
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.pool.group_commit is None:
+            return method(self, *args, **kwargs)
+        with self.pool.get_write_lock(self.pool.get_connection()):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+# Mamba Password Manager - Group Commit Class
+class MambaGroupCommit:
+    def __init__(self, max_ops=GROUP_COMMIT_MAX_OPS, window=GROUP_COMMIT_WINDOW):
+        """This function initialises the 'MambaGroupCommit' class, the settings of a connection pool's group commit mode. Instead of
+        committing after every add, update or delete, writes are left in the connection's open transaction and committed together once
+        'max_ops' writes are pending or 'window' seconds after the first of them, so a burst of writes shares one commit and one sync to
+        disk. The pending writes are also committed when the pool is flushed, which happens when a user logs out and when the application
+        closes. Locking a vault, including the idle lock, doesn't flush the pool, so writes made just before it are committed by the
+        window or the next flush like any others.
+
+        This trades durability for throughput: a crash or power cut can lose up to 'max_ops' writes, or the writes made in the last
+        'window' seconds, which had already been reported as saved. Other connections, including the worker threads of the async
+        facades, don't see the pending writes until they are committed. Leaving group commit off keeps every write durable as soon as
+        the method returns.
+
+        Args:
+            max_ops (int): The number of pending writes which are committed straight away
+            window (float): The number of seconds after the first pending write that the writes are committed, or None to only commit them
+                once 'max_ops' are pending or the pool is flushed
+        """
+        if max_ops < 1:
+            raise ValueError("max_ops must be at least 1")
+        if window is not None and window <= 0:
+            raise ValueError("window must be a positive number of seconds, or None")
+
+        self.max_ops = max_ops
+        self.window = window
+
+
+# Mamba Password Manager - Connection Owner Class
+class ConnectionOwner:
+    """This class marks the thread a pooled connection belongs to. It is only kept in the thread's local storage, so it is garbage
+    collected when the thread exits, which releases the thread's connection."""
+
+
+# Mamba Password Manager - Connection Pool Class
+class MambaConnectionPool:
+    def __init__(self, path, profile=DEFAULT_PROFILE, attachments=None, group_commit=None):
+        """This function initialises the 'MambaConnectionPool' class, which gives every thread its own tuned connection to a database file,
+        so the database classes can be used from the GUI, background workers and services at the same time without sharing a cursor.
+        Connections are opened the first time a thread asks for one and are reused by that thread afterwards, and are committed and closed
+        when the thread exits, so short-lived worker threads don't leave connections open until the application closes.
+
+        Args:
+            path (str): The path of the database file
+            profile (str): The name of the profile in 'CONNECTION_PROFILES'
+            attachments (dict): Other database files to attach to every connection, keyed by the name they are attached as
+            group_commit (MambaGroupCommit): The group commit settings, or None to commit every write straight away
+        """
+        self.path = path
+        self.profile = profile
+        self.attachments = attachments or {}
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        # guards the list of every connection opened by the pool
+        self.finalizers = {}
+        # releases each connection once the thread which opened it exits
+        self.profiler = None
+        # set by 'MambaQueryProfiler.instrument' to open profiled connections, and only checked when a connection is opened
+        self.group_commit = group_commit
+        self.pending = {}
+        # the number of writes waiting to be committed on each connection
+        self.timers = {}
+        # the timer which commits each connection's pending writes once the group commit window has passed
+        self.write_locks = {}
+        # stops a timer committing a connection while its thread is part way through a write
+        self.commit_callbacks = {}
+        # the functions waiting for each connection's pending writes to be committed
+
+    def get_connection(self):
+        """This function retrieves the current thread's connection, opening it if the thread doesn't have one yet.
+
+        Returns:
+            sqlite3.Connection: Returns the current thread's connection
+        """
+        conn = getattr(self.local, "conn", None)
+
+        if conn is None:
+            if self.profiler is None:
+                conn = connect(self.path, self.profile, check_same_thread=False)
+            else:
+                conn = connect(
+                    self.path, self.profile, check_same_thread=False, **self.profiler.connect_kwargs()
+                )
+                self.profiler.attach(conn)
+            for schema, path in self.attachments.items():
+                attach(conn, path, schema, self.profile)
+            # each connection is only used by the thread that opened it, but can be closed by 'close_all' from any thread
+            self.local.conn = conn
+            self.local.owner = ConnectionOwner()
+            finalizer = weakref.finalize(self.local.owner, self.release, conn)
+            finalizer.atexit = False
+            # the owner is dropped with the thread's local storage when the thread exits
+            with self.lock:
+                self.connections.append(conn)
+                self.finalizers[conn] = finalizer
+
+        return conn
+
+    def get_write_lock(self, conn):
+        """This function retrieves the write lock of a connection, creating it the first time it is needed.
+
+        Args:
+            conn (sqlite3.Connection): The connection
+
+        Returns:
+            threading.RLock: Returns the connection's write lock
+        """
+        with self.lock:
+            return self.write_locks.setdefault(conn, threading.RLock())
+
+    def commit(self, wrote=True):
+        """This function commits the current thread's connection after a write. When group commit is on, the write is left pending and
+        committed together with the next writes, once enough are pending or the group commit window has passed.
+
+        Args:
+            wrote (bool): False if the statements didn't change any rows, so the transaction is ended without counting towards the group
+                commit, or left to be committed with the writes already pending
+        """
+        conn = self.get_connection()
+
+        if self.group_commit is None:
+            conn.commit()
+            return
+
+        with self.get_write_lock(conn):
+            if not wrote:
+                if not self.pending.get(conn):
+                    conn.commit()
+                return
+            # a write which changed nothing doesn't start the window, but still ends the transaction if nothing is pending
+            pending = self.pending.get(conn, 0) + 1
+            if pending >= self.group_commit.max_ops:
+                self.flush_connection(conn)
+                return
+
+            self.pending[conn] = pending
+            if pending == 1 and self.group_commit.window is not None:
+                timer = threading.Timer(self.group_commit.window, self.flush_connection, (conn,))
+                timer.daemon = True
+                self.timers[conn] = timer
+                timer.start()
+            # the window starts with the first pending write
+
+    def on_commit(self, callback):
+        """This function calls a function once the current thread's last write has been committed and is visible to other connections,
+        which is straight away unless group commit has left the write pending.
+
+        Args:
+            callback (callable): The function to call, with no arguments
+        """
+        conn = self.get_connection()
+        with self.get_write_lock(conn):
+            if self.pending.get(conn):
+                self.commit_callbacks.setdefault(conn, []).append(callback)
+                return
+        callback()
+
+    def flush_connection(self, conn):
+        """This function commits a connection's pending writes, if it has any.
+
+        Args:
+            conn (sqlite3.Connection): The connection to commit
+        """
+        with self.get_write_lock(conn):
+            timer = self.timers.pop(conn, None)
+            if timer is not None:
+                timer.cancel()
+            if self.pending.pop(conn, 0):
+                conn.commit()
+            for callback in self.commit_callbacks.pop(conn, []):
+                callback()
+
+    def release(self, conn):
+        """This function commits a connection's pending writes and closes it, and is called once the thread which opened it has exited.
+
+        Args:
+            conn (sqlite3.Connection): The connection to release
+        """
+        with self.lock:
+            if conn not in self.finalizers:
+                return
+            del self.finalizers[conn]
+            self.connections.remove(conn)
+        # connections already closed by 'close_all' are skipped
+
+        self.flush_connection(conn)
+        with self.lock:
+            self.write_locks.pop(conn, None)
+        conn.close()
+
+    def flush(self):
+        """This function commits the pending writes of every connection opened by the pool."""
+        with self.lock:
+            connections = list(self.connections)
+        for conn in connections:
+            self.flush_connection(conn)
+
+    def close_all(self):
+        """This function closes every connection opened by the pool, and is called when the application closes."""
+        self.flush()
+        with self.lock:
+            connections, self.connections = self.connections, []
+            finalizers, self.finalizers = self.finalizers, {}
+            self.write_locks = {}
+        for finalizer in finalizers.values():
+            finalizer.detach()
+        for conn in connections:
+            conn.close()
+        self.local = threading.local()
@@ -0,0 +1,141 @@
+# Mamba Password Manager - Database Registry
+
+# Modules
+import os
+import threading
+from mamba_database_connection import DEFAULT_PROFILE
+
+# Constants
+PROFILE_QUERIES_ENV = "MAMBA_PROFILE_QUERIES"
+SLOW_QUERY_MS_ENV = "MAMBA_SLOW_QUERY_MS"
+VAULT_SHARDS_ENV = "MAMBA_VAULT_SHARDS"
+
+
+# Mamba Password Manager - Database Registry Class
+class MambaDatabaseRegistry:
+    def __init__(self, profile=DEFAULT_PROFILE, profiler=None, shards=None, group_commit=None):
+        """This function initialises the 'MambaDatabaseRegistry' class, which holds the one account database and the one password vault
+        database shared by 'main.py', the login GUI and the main GUI. Each database object is only created the first time it is asked for,
+        and its connections are only opened when it first runs a query, so nothing is opened while the application is starting.
+
+        Args:
+            profile (str): The name of the connection profile the databases are opened with
+            profiler (MambaQueryProfiler): The query profiler the databases are instrumented with, or None to leave profiling off
+            shards (str or int): Either 'user' or a number of shards to keep the password vault in sharded files, or None for one file
+            group_commit (MambaGroupCommit): The group commit settings of both databases, or None to commit every write straight away
+        """
+        self.profile = profile
+        self.profiler = profiler
+        self.shards = shards
+        self.group_commit = group_commit
+        self.account_db = None
+        self.password_vault_db = None
+        self.tables_created = False
+        self.lock = threading.Lock()
+        # guards the creation of the database objects, as the async facades may ask for them from worker threads
+
+    def get_account_db(self):
+        """This function retrieves the shared account database, creating it the first time it is asked for.
+
+        Returns:
+            MambaAccountDB: Returns the shared account database
+        """
+        with self.lock:
+            if self.account_db is None:
+                from mamba_account_database import MambaAccountDB
+
+                self.account_db = MambaAccountDB(self.profile, self.group_commit)
+                if self.profiler is not None:
+                    self.profiler.instrument(self.account_db)
+            return self.account_db
+
+    def get_password_vault_db(self):
+        """This function retrieves the shared password vault database, creating it the first time it is asked for.
+
+        Returns:
+            MambaPasswordVaultDB: Returns the shared password vault database, or a 'MambaShardedPasswordVaultDB' with the same methods if
+            the vault is sharded
+        """
+        with self.lock:
+            if self.password_vault_db is None:
+                if self.shards is None:
+                    from mamba_password_vault_database import MambaPasswordVaultDB
+
+                    self.password_vault_db = MambaPasswordVaultDB(profile=self.profile, group_commit=self.group_commit)
+                else:
+                    from mamba_sharded_vault_database import MambaShardedPasswordVaultDB
+
+                    self.password_vault_db = MambaShardedPasswordVaultDB(
+                        self.shards, profile=self.profile, group_commit=self.group_commit
+                    )
+                if self.profiler is not None:
+                    self.profiler.instrument(self.password_vault_db)
+            return self.password_vault_db
+
+    def create_tables(self):
+        """This function creates the tables of both databases, only the first time it is called."""
+        if self.tables_created:
+            return
+        self.get_account_db().create_mamba_account_table()
+        self.get_password_vault_db().create_mamba_password_vault_table()
+        self.tables_created = True
+
+    def close_all(self):
+        """This function closes every connection opened by the shared databases, and is called when the application closes."""
+        with self.lock:
+            databases = [self.account_db, self.password_vault_db]
+        for db in databases:
+            if db is not None:
+                db.close_all()
+        if self.profiler is not None:
+            self.profiler.close()
+            # writes the summary of each method's statements to the slow query log
+
+
+def profiler_from_environment():
+    """This function creates a query profiler if the 'MAMBA_PROFILE_QUERIES' environment variable is set, with the slow query threshold
+    taken from 'MAMBA_SLOW_QUERY_MS' if it is set. The profiler module is only imported when profiling is switched on.
+
+    Returns:
+        MambaQueryProfiler: Returns the query profiler, or None if profiling is off
+    """
+    if not os.environ.get(PROFILE_QUERIES_ENV):
+        return None
+
+    from mamba_query_profiler import MambaQueryProfiler, SLOW_QUERY_MS
+
+    return MambaQueryProfiler(float(os.environ.get(SLOW_QUERY_MS_ENV, SLOW_QUERY_MS)))
+
+
+def shards_from_environment():
+    """This function reads the password vault's shard mode from the 'MAMBA_VAULT_SHARDS' environment variable, which is either 'user'
+    for a shard file per user or a number of hash partitioned shard files.
+
+    Returns:
+        str or int: Returns the shard mode, or None to keep the password vault in one file
+    """
+    shards = os.environ.get(VAULT_SHARDS_ENV)
+    if not shards:
+        return None
+    return int(shards) if shards.isdigit() else shards
+
+
+registry = MambaDatabaseRegistry(profiler=profiler_from_environment(), shards=shards_from_environment())
+
+
+def get_account_db():
+    """This function retrieves the shared account database from the registry.
+
+    Returns:
+        MambaAccountDB: Returns the shared account database
+    """
+    return registry.get_account_db()
+
+
+def get_password_vault_db():
+    """This function retrieves the shared password vault database from the registry.
+
+    Returns:
+        MambaPasswordVaultDB: Returns the shared password vault database
+    """
+    return registry.get_password_vault_db()
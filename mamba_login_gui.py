@@ -3,11 +3,9 @@
 # Modules
 import tkinter as tk
 import customtkinter as ctk
-from mamba_account_database import MambaAccountDB
 from PIL import Image
 from CTkMessagebox import CTkMessagebox
-import sqlite3
-from mamba_main_gui import MainGUI
+from mamba_database_registry import registry
 
 # Constants
 FONT = "Century Gothic"
@@ -21,8 +19,6 @@ MISSING_USERNAME = CTkMessagebox
 class LoginGUI:
     def __init__(self, db):
         self.db = db
-        self.conn = sqlite3.connect("mamba_userdata.db")
-        self.cur = self.conn.cursor()
 
         self.root = ctk.CTkToplevel()
         self.root.title("Mamba Password Manager - Login")
@@ -171,7 +167,9 @@ class LoginGUI:
                 button_hover_color="#FF69B4",
                 title_color="purple",
             )
-            # open up main GUI and close login GUI
+            # open up main GUI and close login GUI, only importing it once the user has logged in
+            from mamba_main_gui import MainGUI
+
             main_gui = MainGUI(username)
             self.root.destroy()
             main_gui.root.mainloop()
@@ -545,6 +543,6 @@ def missing_phone_number():
     )
 
 
-db = MambaAccountDB()
-app = LoginGUI(db)
+registry.create_tables()
+app = LoginGUI(registry.get_account_db())
 app.root.mainloop()
@@ -2,12 +2,13 @@
 
 # Modules
 import tkinter as tk
-from mamba_password_vault_database import MambaPasswordVaultDB
+from tkinter import filedialog
 import customtkinter as ctk
 from CTkMessagebox import CTkMessagebox
 from mamba_password_generator import MambaPasswordGenerator
 from mamba_password_checker import MambaPasswordChecker
-from mamba_account_database import MambaAccountDB
+from mamba_database_registry import registry
+from mamba_website_completer import MambaWebsiteCompleter
 import importlib
 from CTkListbox import CTkListbox
 
@@ -20,15 +21,19 @@ class MainGUI:
         Args:
             username (string): The username of the current logged in user
         """
-        # Password Vault Database object
-        self.password_vault_db = MambaPasswordVaultDB()
+        # Password Vault Database object, shared with the rest of the application
+        self.password_vault_db = registry.get_password_vault_db()
         # Password Generator object
         self.password_generator = MambaPasswordGenerator()
         # Password Checker object
         self.password_checker = MambaPasswordChecker()
-        # Account Database object
-        self.account_db = MambaAccountDB()
+        # Account Database object, shared with the login GUI
+        self.account_db = registry.get_account_db()
         self.username = username
+        # Website completer object, built once from the website list without decrypting any passwords
+        self.website_completer = MambaWebsiteCompleter(
+            entry["website"] for entry in self.password_vault_db.list_passwords(username)
+        )
 
         # Initialise the root window
         self.root = ctk.CTk()
@@ -201,7 +206,7 @@ class MainGUI:
         self.export_password_button = ctk.CTkButton(
             master=self.root,
             width=230,
-            height=200,
+            height=95,
             text="Export Passwords",
             fg_color="purple",
             text_color="black",
@@ -211,6 +216,20 @@ class MainGUI:
         # Place export password button
         self.export_password_button.place(x=1020, y=250)
 
+        # Create import password button
+        self.import_password_button = ctk.CTkButton(
+            master=self.root,
+            width=230,
+            height=95,
+            text="Import Passwords",
+            fg_color="purple",
+            text_color="black",
+            hover_color="#FF69B4",
+            command=self.import_password_vault_submit,
+        )
+        # Place import password button
+        self.import_password_button.place(x=1020, y=355)
+
         # Create generate master key button
         self.generate_master_key_button = ctk.CTkButton(
             master=self.root,
@@ -365,6 +384,7 @@ class MainGUI:
 
         # checks if the website is already in the database
         if self.password_vault_db.add_password(username, website, added_pw):
+            self.website_completer.add(website)
             # adds the password to the database and displays a message to the user on success
             CTkMessagebox(
                 master=self.root,
@@ -444,6 +464,18 @@ class MainGUI:
         self.update_pw_website_name_label.grid(row=0, column=0)
         self.update_pw_website_name_entry.grid(row=0, column=1, pady=5)
 
+        # suggests saved websites as the user types
+        self.update_pw_suggestions_label = ctk.CTkLabel(
+            master=self.update_password_window, text="", text_color="#FF69B4"
+        )
+        self.update_pw_suggestions_label.grid(row=2, column=1)
+        self.update_pw_website_name_entry.bind(
+            "<KeyRelease>",
+            lambda event: self.website_autocomplete(
+                self.update_pw_website_name_entry, self.update_pw_suggestions_label
+            ),
+        )
+
         self.update_password_label.grid(row=1, column=0)
         self.update_password_entry.grid(row=1, column=1, pady=5)
 
@@ -451,6 +483,17 @@ class MainGUI:
 
         self.update_password_window.mainloop()
 
+    def website_autocomplete(self, entry, suggestions_label):
+        """This function shows the saved websites which start with the text typed into a website entry.
+
+        Args:
+            entry (CTkEntry): The website entry being typed into
+            suggestions_label (CTkLabel): The label which shows the suggestions
+        """
+        # looks up completions in memory, without querying the database
+        suggestions = self.website_completer.complete(entry.get())
+        suggestions_label.configure(text="\n".join(suggestions))
+
     def update_password_submit(self):
         """This function updates a password in the database and displays a message to the user on success/failure."""
 
@@ -525,6 +568,18 @@ class MainGUI:
         self.delete_pw_website_label.grid(row=0, column=0)
         self.delete_pw_website_entry.grid(row=0, column=1)
 
+        # suggests saved websites as the user types
+        self.delete_pw_suggestions_label = ctk.CTkLabel(
+            master=self.delete_password_window, text="", text_color="#FF69B4"
+        )
+        self.delete_pw_suggestions_label.grid(row=2, column=1)
+        self.delete_pw_website_entry.bind(
+            "<KeyRelease>",
+            lambda event: self.website_autocomplete(
+                self.delete_pw_website_entry, self.delete_pw_suggestions_label
+            ),
+        )
+
         self.delete_password_submit_button.grid(row=3, column=1, pady=10)
 
         self.delete_password_window.mainloop()
@@ -538,6 +593,7 @@ class MainGUI:
 
         # checks if the website is already in the database
         if self.password_vault_db.delete_password(username, website):
+            self.website_completer.remove(website)
             # deletes the password in the database and displays a message to the user on success
             CTkMessagebox(
                 master=self.root,
@@ -577,6 +633,7 @@ class MainGUI:
             width=300,
             select_color="purple",
             hover_color="#FF69B4",
+            command=self.view_passwords_reveal_submit,
         )
 
         # creates the close password list button
@@ -599,16 +656,36 @@ class MainGUI:
         self.view_passwords_window.mainloop()
 
     def view_passwords_insert(self):
-        """This function inserts the passwords in the user's password vault into the password list widget."""
+        """This function inserts the websites in the user's password vault into the password list widget, without decrypting any passwords."""
         username = self.username
-        # calls the view passwords function in the database and retrieves the passwords
-        passwords = self.password_vault_db.view_passwords(username)
+        self.password_list_ids = {}
+        # streams the website list from the database one entry at a time and inserts them into the password list widget
+        for entry in self.password_vault_db.list_passwords(username):
+            self.password_list_ids[entry["website"]] = entry["id"]
+            self.password_list.insert("end", entry["website"])
 
-        # inserts the passwords into the password list widget
-        for password in passwords:
-            self.password_list.insert(
-                "end", f"{password['website']} - {password['password']}"
-            )
+    def view_passwords_reveal_submit(self, website):
+        """This function decrypts and shows the password of the website selected in the password list widget.
+
+        Args:
+            website (string): The website selected in the password list
+        """
+        username = self.username
+        # decrypts only the selected entry
+        password = self.password_vault_db.reveal(
+            username, self.password_list_ids[website]
+        )
+
+        CTkMessagebox(
+            master=self.view_passwords_window,
+            title=website,
+            message=f"{website} - {password}",
+            icon="info",
+            text_color="purple",
+            button_color="purple",
+            button_hover_color="#FF69B4",
+            title_color="purple",
+        )
 
     def view_passwords_close_submit(self):
         """This function closes the view passwords window."""
@@ -894,6 +971,54 @@ class MainGUI:
                 title_color="purple",
             )
 
+    def import_password_vault_submit(self):
+        """This function imports passwords from an exported JSON file or a CSV file into the user's password vault."""
+        username = self.username
+
+        # asks the user to choose the file to import
+        file_path = filedialog.askopenfilename(
+            title="Import Passwords",
+            filetypes=[("JSON files", "*.json"), ("CSV files", "*.csv")],
+        )
+        if not file_path:
+            return False
+
+        # streams every entry from the file into the password vault using the password vault database class
+        try:
+            added, skipped, _ = self.password_vault_db.import_passwords(username, file_path)
+        except (ValueError, OSError, UnicodeDecodeError) as error:
+            # fails to import the file and displays a message to the user, as the batches read before the error have already been saved
+            self.website_completer = MambaWebsiteCompleter(
+                entry["website"] for entry in self.password_vault_db.list_passwords(username)
+            )
+            CTkMessagebox(
+                master=self.root,
+                title="Failed to import Passwords",
+                message=f"The file couldn't be imported: {error}. Any passwords read before the error have been imported.",
+                icon="cancel",
+                text_color="purple",
+                button_color="purple",
+                button_hover_color="#FF69B4",
+                title_color="purple",
+            )
+            return False
+
+        self.website_completer = MambaWebsiteCompleter(
+            entry["website"] for entry in self.password_vault_db.list_passwords(username)
+        )
+        # rebuilds the website completer with the imported websites
+
+        CTkMessagebox(
+            master=self.root,
+            title="Password Vault Imported",
+            message=f"{added} passwords have been imported, {skipped} already existed or were incomplete.",
+            icon="check" if added else "info",
+            text_color="purple",
+            button_color="purple",
+            button_hover_color="#FF69B4",
+            title_color="purple",
+        )
+
     def logout_submit(self):
         """This function logs the user out of Mamba and closes the main GUI, returning them to the login GUI.
 
@@ -907,6 +1032,9 @@ class MainGUI:
 
         # logs the user out of Mamba and closes the main GUI
         if self.account_db.mamba_account_logout(username):
+            self.password_vault_db.lock_vault(username)
+            self.password_vault_db.flush()
+            # evicts the user's cached master key from the vault session, and commits any writes left pending by group commit
             self.root.destroy()
             lg_module = importlib.import_module("mamba_login_gui")
             lg_module.LoginGUI(db).root.mainloop()
@@ -938,7 +1066,10 @@ class MainGUI:
 
         # closes Mamba and destroys the main GUI
         if response == "Yes":
+            self.password_vault_db.lock_vault(self.username)
             self.root.destroy()
+            registry.close_all()
+            # closes the shared database connections
         else:
             # returns False if the user doesn't want to close Mamba
             return False
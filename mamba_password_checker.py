@@ -2,7 +2,6 @@
 
 # Modules
 import hashlib
-import requests
 
 
 # Mamba Password Checker Class
@@ -31,6 +30,8 @@ class MambaPasswordChecker:
         )
         # Make request to pwnedpasswords API with prefix
         url = self.url + mamba_password_sha1_prefix
+        import requests
+        # requests is only imported the first time a password is checked, so it doesn't slow down starting Mamba
         response = requests.get(url)
 
         # Check response status code
@@ -2,7 +2,6 @@
 
 # Modules
 import secrets
-import pyperclip
 import string
 
 
@@ -66,6 +65,8 @@ class MambaPasswordGenerator:
         self.mamba_password = "".join(secrets.choice(chars) for _ in range(self.length))
         # generates a random password based on the user's selection
 
+        import pyperclip
+        # pyperclip is only imported the first time a password is generated, so it doesn't slow down starting Mamba
         pyperclip.copy(self.mamba_password)
         # copies the generated password to the user's clipboard
 
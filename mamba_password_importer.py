@@ -0,0 +1,107 @@
+# Mamba Password Manager - Password Importer
+
+# Modules
+import csv
+import json
+import os
+
+# Constants
+IMPORT_CHUNK_SIZE = 65536
+
+
+def iter_json_entries(f, chunk_size=IMPORT_CHUNK_SIZE):
+    """This function reads the entries of a JSON array from a file one at a time, such as a file written by 'export_passwords'. The file
+    is read in chunks and each entry is yielded as soon as it has been parsed, so the whole file is never loaded into memory.
+
+    Args:
+        f (file): The open JSON file to read
+        chunk_size (int): The number of characters read from the file at a time
+
+    Raises:
+        ValueError: Raises a value error if the file doesn't contain a JSON array, or the array isn't closed
+
+    Yields:
+        dict: Each entry in the JSON array
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    expect_entry = True
+    first = True
+
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise ValueError("The JSON file ended before the array was closed")
+            buffer = chunk
+            continue
+        # reads the next chunk once everything in the buffer has been parsed
+
+        if not started:
+            if buffer[0] != "[":
+                raise ValueError("The JSON file doesn't contain an array of passwords")
+            started = True
+            buffer = buffer[1:]
+        # the file must start with the opening bracket of the array
+        elif buffer[0] == "]" and (first or not expect_entry):
+            return
+        # stops at the closing bracket of the array
+        elif not expect_entry:
+            if buffer[0] != ",":
+                raise ValueError("The JSON file contains an invalid array of passwords")
+            expect_entry = True
+            buffer = buffer[1:]
+        # entries must be separated by commas
+        else:
+            try:
+                entry, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer += chunk
+                continue
+            # reads more of the file if the entry is split across chunks
+
+            yield entry
+            buffer = buffer[end:]
+            expect_entry = False
+            first = False
+
+
+def iter_csv_entries(f):
+    """This function reads the entries of a CSV file one row at a time. The file must have a header row with 'website' and 'password' columns.
+
+    Args:
+        f (file): The open CSV file to read
+
+    Yields:
+        dict: Each row of the CSV file, keyed by the header row
+    """
+    yield from csv.DictReader(f)
+
+
+def iter_file_entries(file_path):
+    """This function reads the entries of a JSON or CSV password file one at a time, choosing the format from the file extension.
+
+    Args:
+        file_path (str): The path of the file to read
+
+    Raises:
+        ValueError: Raises a value error if the file isn't a JSON or CSV file
+
+    Yields:
+        dict: Each entry in the file, containing the website and password
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+
+    if extension == ".json":
+        with open(file_path, newline="") as f:
+            yield from iter_json_entries(f)
+    elif extension == ".csv":
+        with open(file_path, newline="") as f:
+            yield from iter_csv_entries(f)
+    else:
+        raise ValueError(f"Unsupported file type: {extension}, use a JSON or CSV file")
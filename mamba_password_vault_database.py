@@ -3,46 +3,445 @@
 # Modules
 import sqlite3
 from cryptography.fernet import Fernet
-from mamba_account_database import MambaAccountDB
+from mamba_crypto_engine import make_fernet
+from mamba_crypto_engine import MambaCryptoEngine
+from mamba_password_importer import iter_file_entries
+from mamba_database_connection import MambaConnectionPool, DEFAULT_PROFILE, group_committed
+from mamba_schema_migrations import MambaMigration, MambaMigrationRunner
+from mamba_reveal_cache import MambaRevealCache, REVEAL_CACHE_SIZE, REVEAL_CACHE_TTL
 import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+# Constants
+SESSION_IDLE_TIMEOUT = 300
+BULK_BATCH_SIZE = 500
+CONFLICT_SAMPLE_SIZE = 100
+VIEW_PAGE_SIZE = 200
+SEARCH_LIMIT = 20
+ROTATION_BATCH_SIZE = 1000
+HISTORY_MAX_VERSIONS = 10
+HISTORY_MAX_AGE = None
+HISTORY_PRUNE_BATCH_SIZE = 1000
+SYNC_BATCH_SIZE = 500
+VAULT_DB_PATH = "mamba_password_vault.db"
+ACCOUNT_DB_PATH = "mamba_userdata.db"
 
 
 # Mamba Password Manager - Password Vault Class
 class MambaPasswordVaultDB:
-    def __init__(self):
+    def __init__(
+        self,
+        crypto_engine=None,
+        profile=DEFAULT_PROFILE,
+        history_max_versions=HISTORY_MAX_VERSIONS,
+        history_max_age=HISTORY_MAX_AGE,
+        path=VAULT_DB_PATH,
+        accounts_path=ACCOUNT_DB_PATH,
+        group_commit=None,
+        reveal_cache_size=REVEAL_CACHE_SIZE,
+        reveal_cache_ttl=REVEAL_CACHE_TTL,
+    ):
         """This function initialises the 'MambaPasswordDB' class and it's attributes,  and to enable a connection with the database
-        to allow manipulation of the user data. It connects to the 'mamba_password_vault.db' database file, and assigns the cursor object to the 'cur'
-        attribute to enable execution of SQL statements."""
+        to allow manipulation of the user data. It creates a pool of connections to the 'mamba_password_vault.db' database file, where every
+        thread gets its own connection with the 'mamba_userdata.db' database file attached as 'accounts' so user ids can be joined with master
+        keys in a single query, and each operation creates its own short-lived cursor to execute SQL statements.
+
+        Args:
+            crypto_engine (MambaCryptoEngine): The engine used for bulk encryption and decryption, which defaults to a thread pool engine
+            profile (str): The connection profile used to tune the database connections, either 'safe' or 'fast'
+            history_max_versions (int): The number of previous passwords kept for each entry, or None to keep every version
+            history_max_age (int): The number of seconds previous passwords are kept for by 'prune_history', or None to keep them forever
+            path (str): The path of the password vault database file
+            accounts_path (str): The path of the account database file
+            group_commit (MambaGroupCommit): The group commit settings for adds, updates, deletes and new master keys, or None to commit
+                each of them straight away
+            reveal_cache_size (int): The maximum number of revealed passwords cached, or 0 to decrypt every reveal
+            reveal_cache_ttl (float): The number of seconds a revealed password is cached for
+        """
+
+        self.path = path
+        self.pool = MambaConnectionPool(path, profile, {"accounts": accounts_path}, group_commit)
+        # creates a pool of tuned connections to the database, with the account database attached to each connection
+        self.sessions = {}
+        # stores each unlocked user's id and Fernet object so the key is only resolved once per session
+        self.idle_timer = None
+        self.idle_lock = threading.Lock()
+        # the timer which locks idle sessions, started when a vault is unlocked and stopped once no vault is unlocked
+        self.crypto_engine = crypto_engine or MambaCryptoEngine()
+        # spreads bulk encryption and decryption across several cores
+        self.history_max_versions = history_max_versions
+        self.history_max_age = history_max_age
+        # retention policy for the password history
+        self.reveal_cache = MambaRevealCache(reveal_cache_size, reveal_cache_ttl)
+        # stores recently revealed passwords so revealing them again doesn't query and decrypt them
+
+    @property
+    def conn(self):
+        """This property retrieves the current thread's connection to the database from the connection pool."""
+        return self.pool.get_connection()
 
-        self.conn = sqlite3.connect("mamba_password_vault.db")
-        # establish connection to database
-        self.cur = self.conn.cursor()
-        # cursor is created to allow for querying the database
+    def flush(self):
+        """This function commits every write left pending by group commit, and is called when a user logs out."""
+        self.pool.flush()
 
-    def create_mamba_password_vault_table(self):
+    def close_all(self):
+        """This function closes every connection opened by the database, and is called when the application closes."""
+        with self.idle_lock:
+            if self.idle_timer is not None:
+                self.idle_timer.cancel()
+                self.idle_timer = None
+        self.reveal_cache.wipe()
+        self.pool.close_all()
+
+    def reveal_cache_stats(self):
+        """This function retrieves the reveal cache's hit, miss and eviction counters, so its size and ttl can be tuned.
+
+        Returns:
+            dict: Returns the counters described by 'MambaRevealCache.stats'
+        """
+        return self.reveal_cache.stats()
+
+    def create_mamba_password_vault_table(self, progress=None):
         """This function creates the 'mamba_password_vault' table if it doesn't exist, and will store the password information linked to each user
-        which the account information is retrieved from the 'mamba_userdata' table."""
+        which the account information is retrieved from the 'mamba_userdata' table. Password vaults created by older versions are upgraded to
+        the latest schema by running the migrations they haven't had yet.
+
+        Args:
+            progress (callable): Called with the migration's version, the last row id filled in and the highest row id to fill in after
+                each batch of a migration's backfill is committed
+        """
+        MambaMigrationRunner(self.get_migrations()).migrate(self.conn, progress)
+
+    def get_migrations(self):
+        """This function lists the migrations which build the password vault's schema, one per schema version. New schema changes are
+        added as a new migration with the next version, and existing migrations are never changed once released.
+
+        Returns:
+            list: Returns the 'MambaMigration' steps
+        """
+        return [
+            MambaMigration(1, "create the passwords, keys and password history tables", self.create_vault_tables),
+            MambaMigration(2, "create the full-text search index", self.create_search_index, self.backfill_search_index),
+            MambaMigration(3, "create the change journal", self.create_change_journal, self.backfill_change_journal),
+        ]
+
+    def create_vault_tables(self, cur):
+        """This function creates the 'passwords', 'keys' and 'password_history' tables and their indexes. Vaults created before schema
+        versioning may already have some of them, so every change is only made if it is missing.
+
+        Args:
+            cur (sqlite3.Cursor): The cursor used to create the tables
+        """
 
         # create password vault table with required fields
-        self.cur.execute(
+        cur.execute(
             """
         CREATE TABLE IF NOT EXISTS passwords (
         id INTEGER PRIMARY KEY,
         user_id TEXT,
         website TEXT,
-        encrypted_password BLOB
+        encrypted_password BLOB,
+        created_at INTEGER NOT NULL DEFAULT 0,
+        updated_at INTEGER NOT NULL DEFAULT 0
         )
         """
             # create user id and master key table with required fields
         )
-        self.cur.execute(
+        cur.execute("PRAGMA table_info(passwords)")
+        columns = [row[1] for row in cur.fetchall()]
+        for column in ("created_at", "updated_at"):
+            if column not in columns:
+                cur.execute(
+                    f"ALTER TABLE passwords ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"
+                )
+        # adds the timestamp columns to password vaults created by older versions
+        cur.execute(
             """
         CREATE TABLE IF NOT EXISTS keys (
         user_id TEXT PRIMARY KEY,
-        key BLOB 
+        key BLOB,
+        new_key BLOB,
+        rotated_up_to INTEGER NOT NULL DEFAULT 0
+        )
+        """
+        )
+        cur.execute("PRAGMA table_info(keys)")
+        columns = [row[1] for row in cur.fetchall()]
+        if "new_key" not in columns:
+            cur.execute("ALTER TABLE keys ADD COLUMN new_key BLOB")
+        if "rotated_up_to" not in columns:
+            cur.execute(
+                "ALTER TABLE keys ADD COLUMN rotated_up_to INTEGER NOT NULL DEFAULT 0"
+            )
+        # adds the key rotation columns to password vaults created by older versions
+        cur.execute(
+            """
+        CREATE TABLE IF NOT EXISTS password_history (
+        entry_id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        encrypted_password BLOB,
+        replaced_at INTEGER NOT NULL,
+        PRIMARY KEY (entry_id, version)
+        ) WITHOUT ROWID
+        """
+        )
+        # previous passwords of each entry are kept in their own table, clustered by (entry_id, version), so they never slow down the
+        # 'passwords' table
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS password_history_replaced_at ON password_history (replaced_at)"
+        )
+        # index on replaced_at lets the pruning job find old versions without scanning the table
+        cur.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS password_history_delete AFTER DELETE ON passwords BEGIN
+        DELETE FROM password_history WHERE entry_id = old.id;
+        END
+        """
+        )
+        # the history of an entry is deleted with the entry
+        cur.execute(
+            """
+        INSERT INTO password_history (entry_id, version, encrypted_password, replaced_at)
+        SELECT kept.id,
+        COALESCE((SELECT MAX(version) FROM password_history WHERE entry_id = kept.id), 0)
+        + ROW_NUMBER() OVER (PARTITION BY kept.id ORDER BY duplicate.id),
+        duplicate.encrypted_password, ?
+        FROM passwords AS duplicate
+        JOIN (
+        SELECT MAX(id) AS id, user_id, website FROM passwords GROUP BY user_id, website HAVING COUNT(*) > 1
+        ) AS kept ON duplicate.user_id IS kept.user_id AND duplicate.website IS kept.website AND duplicate.id <> kept.id
+        """,
+            (int(time.time()),),
+        )
+        cur.execute(
+            """
+        DELETE FROM passwords WHERE id NOT IN (
+        SELECT MAX(id) FROM passwords GROUP BY user_id, website
+        )
+        """
+        )
+        # removes duplicate websites left behind by older versions so the unique index can be created, keeping the newest entry and
+        # copying the passwords of the others into its history, oldest first, so none of them are lost
+        cur.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS passwords_user_id_website ON passwords (user_id, website)"
+        )
+        # unique index on (user_id, website) so lookups, updates and deletes don't scan the whole table
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS passwords_user_id ON passwords (user_id)"
+        )
+        # index on user_id keeps each user's entries ordered by id, so vault pages can be read without sorting
+
+    def create_change_journal(self, cur):
+        """This function creates the 'change_journal' table, which records every add, update and delete with a monotonic sequence number
+        so 'sync' only has to exchange the changes made since the last sync, along with the triggers which write to it. Deletes are kept as
+        tombstones. The first time the journal is created, every existing password has to be journaled by 'backfill_change_journal' so the
+        first sync sends the whole vault.
+
+        Args:
+            cur (sqlite3.Cursor): The cursor used to create the tables
+
+        Returns:
+            int: Returns the highest id of the passwords which have to be journaled, or None if there are none
+        """
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='change_journal'"
+        )
+        exists = cur.fetchone() is not None
+
+        cur.execute(
+            """
+        CREATE TABLE IF NOT EXISTS change_journal (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        website TEXT NOT NULL,
+        changed_at INTEGER NOT NULL,
+        origin TEXT NOT NULL,
+        origin_seq INTEGER,
+        deleted INTEGER NOT NULL DEFAULT 0
+        )
+        """
+        )
+        # each change records the vault it was first made in, and its sequence number there, which decide conflicts deterministically
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS change_journal_user_id_website ON change_journal (user_id, website, seq)"
+        )
+        # finds the latest change to an entry when resolving conflicts
+        cur.execute(
+            """
+        CREATE TABLE IF NOT EXISTS sync_replicas (
+        replica_id TEXT PRIMARY KEY,
+        last_seq INTEGER NOT NULL DEFAULT 0,
+        local INTEGER NOT NULL DEFAULT 0
+        )
+        """
+        )
+        # stores this vault's replica id, and the last journal sequence number pulled from every other vault
+        cur.execute(
+            "INSERT INTO sync_replicas (replica_id, local) SELECT ?, 1 WHERE NOT EXISTS (SELECT 1 FROM sync_replicas WHERE local=1)",
+            (str(uuid.uuid4()),),
+        )
+        cur.execute(
+            """
+        CREATE TABLE IF NOT EXISTS journal_context (
+        origin TEXT,
+        origin_seq INTEGER,
+        changed_at INTEGER,
+        suppressed INTEGER NOT NULL DEFAULT 0
+        )
+        """
+        )
+        # only holds a row inside a transaction which is applying changes from another vault, or which shouldn't be journaled
+
+        context = "(SELECT {} FROM journal_context)"
+        now = "CAST(strftime('%s', 'now') AS INTEGER)"
+        local = "(SELECT replica_id FROM sync_replicas WHERE local=1)"
+        unsuppressed = "NOT EXISTS (SELECT 1 FROM journal_context WHERE suppressed=1)"
+        cur.execute(
+            f"""
+        CREATE TRIGGER IF NOT EXISTS change_journal_insert AFTER INSERT ON passwords WHEN {unsuppressed} BEGIN
+        INSERT INTO change_journal (user_id, website, changed_at, origin, origin_seq)
+        VALUES (new.user_id, new.website, COALESCE({context.format("changed_at")}, new.updated_at, {now}), COALESCE({context.format("origin")}, {local}), {context.format("origin_seq")});
+        END
+        """
+        )
+        cur.execute(
+            f"""
+        CREATE TRIGGER IF NOT EXISTS change_journal_update AFTER UPDATE OF encrypted_password ON passwords WHEN {unsuppressed} BEGIN
+        INSERT INTO change_journal (user_id, website, changed_at, origin, origin_seq)
+        VALUES (new.user_id, new.website, COALESCE({context.format("changed_at")}, new.updated_at, {now}), COALESCE({context.format("origin")}, {local}), {context.format("origin_seq")});
+        END
+        """
+        )
+        cur.execute(
+            f"""
+        CREATE TRIGGER IF NOT EXISTS change_journal_delete AFTER DELETE ON passwords WHEN {unsuppressed} BEGIN
+        INSERT INTO change_journal (user_id, website, changed_at, origin, origin_seq, deleted)
+        VALUES (old.user_id, old.website, COALESCE({context.format("changed_at")}, {now}), COALESCE({context.format("origin")}, {local}), {context.format("origin_seq")}, 1);
+        END
+        """
+        )
+        # triggers journal every change made to the 'passwords' table
+
+        if exists:
+            return None
+        cur.execute("SELECT MAX(id) FROM passwords")
+        # the passwords which were saved before the journal existed are journaled in batches by 'backfill_change_journal'
+        return cur.fetchone()[0]
+
+    def backfill_change_journal(self, cur, after_id, up_to, batch_size):
+        """This function journals one batch of the passwords which were saved before the change journal existed.
+
+        Args:
+            cur (sqlite3.Cursor): The cursor used to fill in the journal
+            after_id (int): The id of the last password journaled
+            up_to (int): The highest id of the passwords to journal
+            batch_size (int): The number of passwords journaled in the batch
+
+        Returns:
+            int: Returns the id of the last password journaled, or None if there are none left
+        """
+        cur.execute(
+            "SELECT id, user_id, website, COALESCE(updated_at, 0) FROM passwords WHERE id>? AND id<=? ORDER BY id LIMIT ?",
+            (after_id, up_to, batch_size),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return None
+
+        cur.executemany(
+            "INSERT INTO change_journal (user_id, website, changed_at, origin) VALUES (?, ?, ?, (SELECT replica_id FROM sync_replicas WHERE local=1))",
+            (row[1:] for row in rows),
+        )
+        return rows[-1][0]
+
+    def create_search_index(self, cur):
+        """This function creates the 'passwords_search' full-text search index over website names, and the triggers which keep it in sync
+        with the 'passwords' table. The first time it is created, the existing passwords have to be indexed by 'backfill_search_index'. If
+        this SQLite build doesn't include FTS5, the index is skipped and 'search' falls back to a prefix match.
+
+        Args:
+            cur (sqlite3.Cursor): The cursor used to create the table
+
+        Returns:
+            int: Returns the highest id of the passwords which have to be indexed, or None if there are none
+        """
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='passwords_search'"
+        )
+        exists = cur.fetchone() is not None
+
+        try:
+            cur.execute(
+                """
+        CREATE VIRTUAL TABLE IF NOT EXISTS passwords_search USING fts5(
+        website,
+        content='passwords',
+        content_rowid='id',
+        prefix='2 3'
+        )
+        """
+            )
+        except sqlite3.OperationalError:
+            return None
+        # full-text index which reads the website names from the 'passwords' table, with prefix indexes for type-ahead searches
+
+        cur.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS passwords_search_insert AFTER INSERT ON passwords BEGIN
+        INSERT INTO passwords_search (rowid, website) VALUES (new.id, new.website);
+        END
+        """
+        )
+        cur.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS passwords_search_delete AFTER DELETE ON passwords BEGIN
+        INSERT INTO passwords_search (passwords_search, rowid, website) VALUES ('delete', old.id, old.website);
+        END
+        """
         )
+        cur.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS passwords_search_update AFTER UPDATE OF website ON passwords BEGIN
+        INSERT INTO passwords_search (passwords_search, rowid, website) VALUES ('delete', old.id, old.website);
+        INSERT INTO passwords_search (rowid, website) VALUES (new.id, new.website);
+        END
         """
         )
+        # triggers keep the search index in sync with every insert, delete and website change
+
+        if exists:
+            return None
+        cur.execute("SELECT MAX(id) FROM passwords")
+        # the passwords which were saved before the search index existed are indexed in batches by 'backfill_search_index'
+        return cur.fetchone()[0]
+
+    def backfill_search_index(self, cur, after_id, up_to, batch_size):
+        """This function indexes one batch of the passwords which were saved before the search index existed.
+
+        Args:
+            cur (sqlite3.Cursor): The cursor used to fill in the index
+            after_id (int): The id of the last password indexed
+            up_to (int): The highest id of the passwords to index
+            batch_size (int): The number of passwords indexed in the batch
+
+        Returns:
+            int: Returns the id of the last password indexed, or None if there are none left
+        """
+        cur.execute(
+            "SELECT id, website FROM passwords WHERE id>? AND id<=? ORDER BY id LIMIT ?",
+            (after_id, up_to, batch_size),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return None
+
+        cur.executemany("INSERT INTO passwords_search (rowid, website) VALUES (?, ?)", rows)
+        return rows[-1][0]
 
     def get_user_id(self, username):
         """This function retrieves the unique user id which is linked to an account from the 'mamba_userdata' database.
@@ -53,14 +452,51 @@ class MambaPasswordVaultDB:
         Returns:
             user_id: Returns the user_id if it is found in the database
         """
-        # Query account db directly
-        account_db.cur.execute(
-            "SELECT mamba_account_unique_id FROM mamba_userdata WHERE mamba_account_username=?",
+        # Query the attached account db
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT mamba_account_unique_id FROM accounts.mamba_userdata WHERE mamba_account_username=?",
             (username,),
         )
-        user_id = account_db.cur.fetchone()[0]
+        user_id = cur.fetchone()[0]
         return user_id
 
+    def get_user_id_and_key(self, username):
+        """This function retrieves the unique user id and the master key of a user in a single query, by joining the attached 'mamba_userdata'
+        table with the 'keys' table.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+
+        Returns:
+            tuple: Returns the user_id and the master key, where the key is None if the user hasn't generated one yet
+        """
+        user_id, key, _ = self.get_user_keys(username)
+        return user_id, key
+
+    def get_user_keys(self, username):
+        """This function retrieves the unique user id, the master key and any new master key which is being rotated in, in a single query.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+
+        Returns:
+            tuple: Returns the user_id, the master key and the new master key, where the keys are None if they don't exist
+        """
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+        SELECT accounts.mamba_userdata.mamba_account_unique_id, keys.key, keys.new_key
+        FROM accounts.mamba_userdata
+        LEFT JOIN keys ON keys.user_id = accounts.mamba_userdata.mamba_account_unique_id
+        WHERE accounts.mamba_userdata.mamba_account_username=?
+        """,
+            (username,),
+        )
+        user_id, key, new_key = cur.fetchone()
+        return user_id, key, new_key
+
+    @group_committed
     def generate_master_key(self, username):
         """This function generates a unique master key which is associated with each user, used for encryption and decryption of their passwords.
 
@@ -70,13 +506,8 @@ class MambaPasswordVaultDB:
         Returns:
             Boolean: Returns False if a master key for the user already exists, otherwise it generates the key and inserts it into the database.
         """
-        # Lookup user id in account DB
-        user_id = self.get_user_id(username)
-
-        # Generate encryption key
-        self.cur.execute("SELECT * FROM keys WHERE user_id=?", (user_id,))
-
-        existing_key = self.cur.fetchone()
+        # Lookup user id and any existing key in a single query
+        user_id, existing_key = self.get_user_id_and_key(username)
 
         if existing_key:
             return False
@@ -84,10 +515,112 @@ class MambaPasswordVaultDB:
         # Only generate new key if one doesn't exist
         if not existing_key:
             key = Fernet.generate_key()
-            self.cur.execute("INSERT INTO keys VALUES (?, ?)", (user_id, key))
-            self.conn.commit()
+            cur = self.conn.cursor()
+            cur.execute("INSERT INTO keys (user_id, key) VALUES (?, ?)", (user_id, key))
+            self.pool.commit()
+            self.pool.flush_connection(self.conn)
+            # the key is committed straight away even with group commit on, so every thread's connection can see it
+            self.lock_vault(username)
+            # evicts any session which was unlocked before the key existed
             return True
 
+    def rotate_master_key(self, username, batch_size=ROTATION_BATCH_SIZE, progress=None):
+        """This function replaces the user's master key with a new one and re-encrypts every password in their vault with it. Passwords are
+        re-encrypted in batches ordered by id, and each batch is committed together with a checkpoint of the last id it re-encrypted, so
+        if the rotation is interrupted, calling this function again resumes from the last committed batch with the same new key. While the
+        rotation is in progress, the vault keeps working as passwords are decrypted with either key.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+            batch_size (int): The number of passwords re-encrypted and committed together
+            progress (callable): Called with the number of passwords re-encrypted so far after each batch is committed
+
+        Returns:
+            Boolean: Returns True once the rotation is complete, or False if the user doesn't have a master key to rotate
+        """
+        user_id, key, new_key = self.get_user_keys(username)
+
+        if not key:
+            return False
+
+        cur = self.conn.cursor()
+        if not new_key:
+            new_key = Fernet.generate_key()
+            cur.execute(
+                "UPDATE keys SET new_key=?, rotated_up_to=0 WHERE user_id=?",
+                (new_key, user_id),
+            )
+            self.conn.commit()
+        # the new key is saved before any password is re-encrypted with it, so an interrupted rotation can always be resumed
+        self.lock_vault(username)
+        # evicts the session so it is unlocked again with both keys
+
+        cur.execute("SELECT rotated_up_to FROM keys WHERE user_id=?", (user_id,))
+        after_id = cur.fetchone()[0]
+        rotated = 0
+        self.pool.flush_connection(self.conn)
+        # commits any writes left pending by group commit, so rolling back a failed batch can't undo them
+
+        try:
+            while True:
+                cur.execute(
+                    "SELECT id, encrypted_password FROM passwords WHERE user_id=? AND id>? ORDER BY id LIMIT ?",
+                    (user_id, after_id, batch_size),
+                )
+                rows = cur.fetchall()
+                if not rows:
+                    break
+
+                encrypted_pwds = self.crypto_engine.rotate_many(
+                    [new_key, key], (row[1] for row in rows)
+                )
+                # re-encrypts the batch in parallel with the new key
+                cur.execute("INSERT INTO journal_context (suppressed) VALUES (1)")
+                # re-encrypting doesn't change any password, so it isn't journaled
+                cur.executemany(
+                    "UPDATE passwords SET encrypted_password=? WHERE id=?",
+                    [(encrypted_pwd, row[0]) for row, encrypted_pwd in zip(rows, encrypted_pwds)],
+                )
+
+                cur.execute(
+                    "SELECT entry_id, version, encrypted_password FROM password_history WHERE entry_id BETWEEN ? AND ? AND entry_id IN (SELECT id FROM passwords WHERE user_id=?)",
+                    (rows[0][0], rows[-1][0], user_id),
+                )
+                history = cur.fetchall()
+                encrypted_history = self.crypto_engine.rotate_many(
+                    [new_key, key], (row[2] for row in history)
+                )
+                cur.executemany(
+                    "UPDATE password_history SET encrypted_password=? WHERE entry_id=? AND version=?",
+                    [(encrypted_pwd, row[0], row[1]) for row, encrypted_pwd in zip(history, encrypted_history)],
+                )
+                # re-encrypts the previous passwords of the entries in the batch with the new key
+                cur.execute("DELETE FROM journal_context")
+                after_id = rows[-1][0]
+                cur.execute(
+                    "UPDATE keys SET rotated_up_to=? WHERE user_id=?", (after_id, user_id)
+                )
+                self.conn.commit()
+                # the batch and its checkpoint are committed together
+
+                rotated += len(rows)
+                if progress:
+                    progress(rotated)
+        except Exception:
+            self.conn.rollback()
+            raise
+        # a failed batch is rolled back, leaving the checkpoint at the last committed batch
+
+        cur.execute(
+            "UPDATE keys SET key=new_key, new_key=NULL, rotated_up_to=0 WHERE user_id=?",
+            (user_id,),
+        )
+        self.conn.commit()
+        self.lock_vault(username)
+        # the new key replaces the old one once every password has been re-encrypted
+        return True
+
+    @group_committed
     def add_password(self, username, website, password):
         """This function allows a user to add a new password to their password vault, which is associated to their Mamba account,
         by providing a website and password to store in the database.
@@ -101,25 +634,163 @@ class MambaPasswordVaultDB:
             Boolean: Returns True if the password has been added into the database
         """
 
-        if not website or not password or self.website_exists(username, website):
+        if not website or not password:
             return False
 
-        user_id = self.get_user_id(username)
-        key = self.get_key(user_id)
-        # retrieves user's id and master key
-        fernet = Fernet(key)
-        # uses master key for encryption and decryption
+        session = self.get_session(username)
+        user_id = session["user_id"]
+        fernet = session["fernet"]
+        # retrieves user's id and cached Fernet object from the session
+
+        if fernet is None:
+            return False
+        # returns False if the user has no master key
+
         encrypted_pwd = fernet.encrypt(password.encode())
         # encrypts the entered password with the key
+        now = int(time.time())
 
-        # Save encrypted password
-        self.cur.execute(
-            "INSERT INTO passwords VALUES (?, ?, ?, ?)",
-            (None, user_id, website, encrypted_pwd),
+        # Save encrypted password, skipping the insert if the website already exists
+        cur = self.conn.cursor()
+        cur.execute(
+            "INSERT INTO passwords (user_id, website, encrypted_password, created_at, updated_at) VALUES (?, ?, ?, ?, ?) ON CONFLICT (user_id, website) DO NOTHING RETURNING id",
+            (user_id, website, encrypted_pwd, now, now),
         )
+        added = cur.fetchone() is not None
+        self.pool.commit(wrote=added)
+        return added
+        # returns False if the website already exists for the user
 
-        self.conn.commit()
-        return True
+    def add_passwords(self, username, entries, commit_batches=False, max_conflicts=CONFLICT_SAMPLE_SIZE):
+        """This function allows a user to add many passwords to their password vault at once, such as when importing existing credentials.
+        The passwords are encrypted in batches and written with 'executemany' inside a single transaction, and entries which can't be added
+        are reported instead of aborting the import. Entries are only held in memory one batch at a time.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+            entries (iterable): The entries to add, either as (website, password) pairs or as dictionaries with 'website' and 'password' keys
+            commit_batches (bool): If True, each batch is committed in its own transaction instead of committing everything at the end
+            max_conflicts (int): The maximum number of skipped websites listed, so skipping most of a large import doesn't build an
+                unbounded list
+
+        Returns:
+            tuple: Returns the number of passwords added, the number of entries skipped because their website already exists, is repeated
+            within the entries, or they are malformed or missing a website or password, and a list of the first 'max_conflicts' websites
+            skipped
+        """
+        session = self.get_session(username)
+        user_id = session["user_id"]
+        fernet = session["fernet"]
+        # retrieves user id and cached Fernet object from the session
+
+        if fernet is None:
+            return 0, 0, []
+        # nothing can be added if the user has no master key
+
+        added = skipped = 0
+        conflicts = []
+        batch = {}
+        self.pool.flush_connection(self.conn)
+        # commits any writes left pending by group commit, so rolling back a failed import can't undo them
+
+        try:
+            for entry in entries:
+                if isinstance(entry, dict):
+                    website, password = entry.get("website"), entry.get("password")
+                elif isinstance(entry, (list, tuple)) and len(entry) == 2:
+                    website, password = entry
+                else:
+                    website = password = None
+                # entries which are neither a dictionary nor a pair are malformed
+
+                if not isinstance(website, str) or not isinstance(password, str) or not website or not password or website in batch:
+                    skipped += 1
+                    if len(conflicts) < max_conflicts:
+                        conflicts.append(website)
+                    continue
+                # skips malformed entries, entries with missing fields and websites repeated within the batch
+                batch[website] = password
+                # websites repeated in a later batch are found by the existing website lookup
+
+                if len(batch) >= BULK_BATCH_SIZE:
+                    inserted, existing = self.add_passwords_batch(user_id, session["key"], list(batch.items()))
+                    added += inserted
+                    skipped += len(existing)
+                    conflicts.extend(existing[: max(max_conflicts - len(conflicts), 0)])
+                    batch = {}
+                    if commit_batches:
+                        self.conn.commit()
+
+            if batch:
+                inserted, existing = self.add_passwords_batch(user_id, session["key"], list(batch.items()))
+                added += inserted
+                skipped += len(existing)
+                conflicts.extend(existing[: max(max_conflicts - len(conflicts), 0)])
+
+            self.conn.commit()
+            # every batch is saved with a single commit
+        except Exception:
+            self.conn.rollback()
+            raise
+        # nothing is saved if the import fails part way through, except for batches which have already been committed
+
+        return added, skipped, conflicts
+
+    def add_passwords_batch(self, user_id, key, batch):
+        """This function encrypts and inserts one batch of passwords for 'add_passwords' without committing, skipping any websites which
+        already exist in the vault.
+
+        Args:
+            user_id (str): The user id of the current user's account
+            key (bytes): The user's master key used to encrypt the passwords
+            batch (list): The (website, password) pairs to insert
+
+        Returns:
+            tuple: Returns the number of passwords inserted, and a list of the websites in the batch which already exist
+        """
+        placeholders = ", ".join("?" for _ in batch)
+        cur = self.conn.cursor()
+        cur.execute(
+            f"SELECT website FROM passwords WHERE user_id=? AND website IN ({placeholders})",
+            (user_id, *(website for website, _ in batch)),
+        )
+        existing = {row[0] for row in cur.fetchall()}
+        # looks up which websites in the batch already exist with one indexed query
+
+        new_entries = [(website, password) for website, password in batch if website not in existing]
+        skipped = [website for website, _ in batch if website in existing]
+
+        encrypted_pwds = self.crypto_engine.encrypt_many(
+            key, (password for _, password in new_entries)
+        )
+        # encrypts every new password in the batch in parallel
+        now = int(time.time())
+        rows = [
+            (user_id, website, encrypted_pwd, now, now)
+            for (website, _), encrypted_pwd in zip(new_entries, encrypted_pwds)
+        ]
+
+        cur.executemany(
+            "INSERT INTO passwords (user_id, website, encrypted_password, created_at, updated_at) VALUES (?, ?, ?, ?, ?) ON CONFLICT (user_id, website) DO NOTHING",
+            rows,
+        )
+        return len(rows), skipped
+
+    def import_passwords(self, username, file_path):
+        """This function allows a user to import passwords into their password vault from a JSON file, such as one written by
+        'export_passwords', or from a CSV file with 'website' and 'password' columns. The file is read one entry at a time and written
+        in batches, each in its own transaction, so files of any size can be imported within a fixed amount of memory.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+            file_path (str): The path of the JSON or CSV file to import
+
+        Returns:
+            tuple: Returns the number of passwords imported, the number of entries skipped, and a list of the first websites skipped
+        """
+        return self.add_passwords(
+            username, iter_file_entries(file_path), commit_batches=True
+        )
 
     def view_passwords(self, username):
         """This function allows a user to retrieve and view all of the passwords from their password vault, which is associated to their Mamba account.
@@ -130,31 +801,178 @@ class MambaPasswordVaultDB:
         Returns:
             passwords: Returns all of the passwords in the user's password vault as a list of dictionaries containing the website and decrypted password
         """
-        user_id = self.get_user_id(username)
-        # retrieves user id
+        passwords = []
 
-        self.cur.execute("SELECT * FROM passwords WHERE user_id=?", (user_id,))
-        # selects all fields from passwords table where user id matches
+        for entry in self.iter_passwords(username):
+            passwords.append({"website": entry["website"], "password": entry["password"]})
+            # appends the decrypted password to the passwords list as a dictionary
 
-        rows = self.cur.fetchall()
-        # fetches all rows from the query
+        return passwords
 
-        passwords = []
+    def iter_passwords(self, username, page_size=VIEW_PAGE_SIZE, after_id=0):
+        """This function streams the passwords from the user's password vault one at a time. The vault is read in pages ordered by id,
+        where each page starts after the last id of the previous one, and each page is decrypted in parallel just before its entries are
+        yielded, so memory use stays flat at one page and the first entry is available after a single page regardless of the size of the
+        vault.
 
-        for row in rows:
-            id, user_id, website, encrypted_pwd = row
-            key = self.get_key(user_id)
-            fernet = Fernet(key)
-            decrypted_pwd = fernet.decrypt(encrypted_pwd).decode()
-            # decrypts the encrypted password with the key
+        Args:
+            username (str): The username associated to the user's Mamba account
+            page_size (int): The number of rows to read from the database per page
+            after_id (int): Only entries with an id greater than this are yielded, allowing a previous read to be resumed
 
-            passwords.append({"website": website, "password": decrypted_pwd})
-            # appends the decrypted password to the passwords list as a dictionary
+        Yields:
+            dict: A dictionary containing the id, website and decrypted password of each entry
+        """
+        session = self.get_session(username)
+        user_id = session["user_id"]
+        key = session["key"]
+        # retrieves user id and cached master key from the session
 
-            print(passwords)
-        return passwords
+        if key is None:
+            return
+        # a user without a master key has no passwords to decrypt
+
+        cur = self.conn.cursor()
+        # uses its own cursor so other vault operations can run while the generator is paused
+
+        while True:
+            cur.execute(
+                "SELECT id, website, encrypted_password FROM passwords WHERE user_id=? AND id>? ORDER BY id LIMIT ?",
+                (user_id, after_id, page_size),
+            )
+            rows = cur.fetchall()
+            # selects the next page of the user's passwords
+
+            decrypted_pwds = self.crypto_engine.decrypt_many(key, (row[2] for row in rows))
+            # decrypts the page in parallel with the key
+
+            for (id, website, _), decrypted_pwd in zip(rows, decrypted_pwds):
+                yield {"id": id, "website": website, "password": decrypted_pwd}
+
+            if len(rows) < page_size:
+                break
+            after_id = rows[-1][0]
+            # the next page starts after the last id of this page
+
+    def list_passwords(self, username, page_size=VIEW_PAGE_SIZE, after_id=0):
+        """This function streams the metadata of the entries in the user's password vault without reading or decrypting any passwords,
+        so screens which only need the list of websites don't pay for any decryption. Pages work the same way as 'iter_passwords'.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+            page_size (int): The number of rows to read from the database per page
+            after_id (int): Only entries with an id greater than this are yielded, allowing a previous read to be resumed
+
+        Yields:
+            dict: A dictionary containing the id, website, created_at and updated_at of each entry
+        """
+        user_id = self.get_session(username)["user_id"]
+        # retrieves user id from the session
+
+        cur = self.conn.cursor()
+
+        while True:
+            cur.execute(
+                "SELECT id, website, created_at, updated_at FROM passwords WHERE user_id=? AND id>? ORDER BY id LIMIT ?",
+                (user_id, after_id, page_size),
+            )
+            rows = cur.fetchall()
+            # selects the next page of metadata, leaving the encrypted passwords untouched
+
+            for id, website, created_at, updated_at in rows:
+                yield {
+                    "id": id,
+                    "website": website,
+                    "created_at": created_at,
+                    "updated_at": updated_at,
+                }
+
+            if len(rows) < page_size:
+                break
+            after_id = rows[-1][0]
+
+    def reveal(self, username, entry_id):
+        """This function decrypts and returns the password of a single entry in the user's password vault.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+            entry_id (int): The id of the entry to reveal
+
+        Returns:
+            str: Returns the decrypted password, or None if the entry doesn't exist in the user's vault
+        """
+        session = self.get_session(username)
+        # retrieves user id and cached Fernet object from the session, locking the vault and wiping its cached passwords if it was idle
+
+        password = self.reveal_cache.get(username, entry_id)
+        if password is not None:
+            return password
+        # recently revealed passwords are returned without querying or decrypting them
+        generation = self.reveal_cache.generation
+        # the password is only cached if the entry isn't updated or deleted while it is being read
+
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT encrypted_password FROM passwords WHERE id=? AND user_id=?",
+            (entry_id, session["user_id"]),
+        )
+        row = cur.fetchone()
+        # only entries which belong to the user can be revealed
+
+        if row is None or session["fernet"] is None:
+            return None
+        password = session["fernet"].decrypt(row[0]).decode()
+        self.reveal_cache.put(username, entry_id, password, generation)
+        return password
+
+    def search(self, username, query, limit=SEARCH_LIMIT):
+        """This function searches the websites in the user's password vault, where every word in the query must match the start of a word in
+        the website name, so 'git' finds 'github.com' and 'mail goo' finds 'mail.google.com'. Results are ranked by relevance using the
+        full-text search index, and no passwords are decrypted.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+            query (str): The text to search for
+            limit (int): The maximum number of results to return
+
+        Returns:
+            list: Returns a list of dictionaries containing the id, website, created_at and updated_at of each matching entry, best match first
+        """
+        user_id = self.get_session(username)["user_id"]
+        # retrieves user id from the session
+
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        # only letters and digits are searched for, so the query can't contain FTS5 syntax
+
+        cur = self.conn.cursor()
+        try:
+            cur.execute(
+                """
+        SELECT passwords.id, passwords.website, passwords.created_at, passwords.updated_at
+        FROM passwords_search
+        JOIN passwords ON passwords.id = passwords_search.rowid
+        WHERE passwords_search MATCH ? AND passwords.user_id=?
+        ORDER BY passwords_search.rank
+        LIMIT ?
+        """,
+                (" ".join(f'"{term}"*' for term in terms), user_id, limit),
+            )
+        except sqlite3.OperationalError:
+            cur.execute(
+                "SELECT id, website, created_at, updated_at FROM passwords WHERE user_id=? AND website LIKE ? ORDER BY website LIMIT ?",
+                (user_id, f"{query}%", limit),
+            )
+        # falls back to a prefix match if this SQLite build doesn't include FTS5
+
+        return [
+            {"id": id, "website": website, "created_at": created_at, "updated_at": updated_at}
+            for id, website, created_at, updated_at in cur.fetchall()
+        ]
 
     # Update password
+    @group_committed
     def update_password(self, username, website, new_password):
         """This function allows a user to update an existing password in their password vault.
 
@@ -167,27 +985,147 @@ class MambaPasswordVaultDB:
             Boolean: True if the password was updated successfully, False otherwise
         """
 
-        if not self.website_exists(username, website) or not new_password:
+        if not new_password:
             return False
-        # check if website exists for user
 
-        user_id = self.get_user_id(username)
-        # retrieves user id
+        session = self.get_session(username)
+        user_id = session["user_id"]
+        fernet = session["fernet"]
+        # retrieves user id and cached Fernet object from the session
+
+        if fernet is None:
+            return False
 
-        key = self.get_key(user_id)
-        fernet = Fernet(key)
         encrypted_new_pwd = fernet.encrypt(new_password.encode())
         # encrypts the new password with the key
 
-        self.cur.execute(
-            "UPDATE passwords SET encrypted_password=? WHERE user_id=? AND website=?",
-            (encrypted_new_pwd, user_id, website),
+        now = int(time.time())
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+        INSERT INTO password_history (entry_id, version, encrypted_password, replaced_at)
+        SELECT id, COALESCE((SELECT MAX(version) FROM password_history WHERE entry_id = passwords.id), 0) + 1, encrypted_password, ?
+        FROM passwords WHERE user_id=? AND website=?
+        RETURNING entry_id, version
+        """,
+            (now, user_id, website),
         )
-        self.conn.commit()
+        row = cur.fetchone()
+        # copies the old encrypted password into the history as the entry's next version
+
+        if row is None:
+            self.pool.commit(wrote=False)
+            return False
+        # returns False if the website doesn't exist for the user
+        entry_id, version = row
+        self.reveal_cache.invalidate(username, entry_id)
+        # the old password is no longer revealed from the cache by this thread, which already sees the new one
+
+        cur.execute(
+            "UPDATE passwords SET encrypted_password=?, updated_at=? WHERE id=?",
+            (encrypted_new_pwd, now, entry_id),
+        )
+        if self.history_max_versions is not None:
+            cur.execute(
+                "DELETE FROM password_history WHERE entry_id=? AND version<=?",
+                (entry_id, version - self.history_max_versions),
+            )
+        # only the most recent versions are kept
+        self.pool.commit()
         # updates the old encrypted password with the new encrypted password and commits the database changes
+        self.pool.on_commit(lambda: self.reveal_cache.invalidate(username, entry_id))
+        # the old password may have been cached by another connection until the new one was committed, so it is dropped again then
         return True
 
+    def view_password_history(self, username, website):
+        """This function allows a user to view the previous passwords of an entry in their password vault.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+            website (str): The website of the entry
+
+        Returns:
+            list: Returns a list of dictionaries containing the version, decrypted password and the time it was replaced, newest first
+        """
+        session = self.get_session(username)
+        # retrieves user id and cached master key from the session
+
+        if session["key"] is None:
+            return []
+        # a user without a master key has no passwords to decrypt
+
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+        SELECT password_history.version, password_history.encrypted_password, password_history.replaced_at
+        FROM passwords
+        JOIN password_history ON password_history.entry_id = passwords.id
+        WHERE passwords.user_id=? AND passwords.website=?
+        ORDER BY password_history.version DESC
+        """,
+            (session["user_id"], website),
+        )
+        rows = cur.fetchall()
+
+        decrypted_pwds = self.crypto_engine.decrypt_many(session["key"], (row[1] for row in rows))
+        return [
+            {"version": version, "password": decrypted_pwd, "replaced_at": replaced_at}
+            for (version, _, replaced_at), decrypted_pwd in zip(rows, decrypted_pwds)
+        ]
+
+    def prune_history(self, batch_size=HISTORY_PRUNE_BATCH_SIZE):
+        """This function applies the history retention policy to every entry in the vault, deleting versions older than the maximum age
+        and any versions beyond the maximum number kept per entry. Versions are deleted in batches, each committed on its own, so the job
+        never holds the write lock for long.
+
+        Args:
+            batch_size (int): The number of versions deleted per batch
+
+        Returns:
+            int: Returns the number of versions deleted
+        """
+        cur = self.conn.cursor()
+        deleted = 0
+        statements = []
+
+        if self.history_max_age is not None:
+            statements.append(
+                (
+                    """
+        DELETE FROM password_history WHERE (entry_id, version) IN (
+        SELECT entry_id, version FROM password_history WHERE replaced_at<? LIMIT ?
+        )
+        """,
+                    (int(time.time()) - self.history_max_age,),
+                )
+            )
+        if self.history_max_versions is not None:
+            statements.append(
+                (
+                    """
+        DELETE FROM password_history WHERE (entry_id, version) IN (
+        SELECT entry_id, version FROM password_history AS old
+        WHERE version <= (SELECT MAX(version) FROM password_history WHERE entry_id = old.entry_id) - ?
+        LIMIT ?
+        )
+        """,
+                    (self.history_max_versions,),
+                )
+            )
+
+        for statement, parameters in statements:
+            while True:
+                cur.execute(statement, (*parameters, batch_size))
+                self.conn.commit()
+                deleted += cur.rowcount
+                if cur.rowcount < batch_size:
+                    break
+            # deletes a batch at a time until there is nothing left to delete
+
+        return deleted
+
     # Delete password
+    @group_committed
     def delete_password(self, username, website):
         """This function allows a user to delete an existing password from their password vault.
 
@@ -199,19 +1137,24 @@ class MambaPasswordVaultDB:
             Boolean: True if the password was deleted successfully from the database, False otherwise
         """
 
-        # checks if website exists
-        if not self.website_exists(username, website):
-            return False
-        # returns false if no website found
-        user_id = self.get_user_id(username)
+        user_id = self.get_session(username)["user_id"]
 
-        self.cur.execute(
-            "DELETE FROM passwords WHERE user_id=? AND website=?", (user_id, website)
+        cur = self.conn.cursor()
+        cur.execute(
+            "DELETE FROM passwords WHERE user_id=? AND website=? RETURNING id",
+            (user_id, website),
         )
         # query to delete password assoicated to website
-        self.conn.commit()
+        row = cur.fetchone()
+        deleted = row is not None
+        self.pool.commit(wrote=deleted)
+        if deleted:
+            self.reveal_cache.invalidate(username, row[0])
+            self.pool.on_commit(lambda: self.reveal_cache.invalidate(username, row[0]))
+        # the deleted password is dropped from the cache now, and again once the delete is visible to other connections
         # change saved in database
-        return True
+        return deleted
+        # returns false if no website found
 
     def get_key(self, user_id):
         """This function retrieves the user's master key from the 'keys' table within the password vault database.
@@ -223,12 +1166,115 @@ class MambaPasswordVaultDB:
             string: Returns key if it was found 
         """
         # queries database for user's master key
-        self.cur.execute("SELECT key FROM keys WHERE user_id=?", (user_id,))
-        key = self.cur.fetchone()[0]
+        cur = self.conn.cursor()
+        cur.execute("SELECT key FROM keys WHERE user_id=?", (user_id,))
+        key = cur.fetchone()[0]
         # stores query result within a list
         return key
         # returns key 
 
+    def unlock_vault(self, username):
+        """This function unlocks the user's password vault for the current session by resolving their user id and master key once,
+        and caching the Fernet object so it can be reused by every vault operation.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+
+        Returns:
+            dict: Returns the session containing the user id, master key (or keys during a rotation), Fernet object (None if the user has
+            no master key) and the time it was last used. Sessions without a master key aren't cached, so the key is picked up as soon as
+            it is generated
+        """
+        user_id, key, new_key = self.get_user_keys(username)
+        if new_key:
+            key = [new_key, key]
+        # while a key rotation is in progress, new passwords are encrypted with the new key and either key can decrypt
+        fernet = make_fernet(key) if key else None
+        # resolves the user id and master key in one query, and creates the Fernet object once
+
+        session = {
+            "user_id": user_id,
+            "key": key,
+            "fernet": fernet,
+            "last_used": time.time(),
+        }
+        if key is None:
+            return session
+        # a session without a key is resolved again on every call until the user has generated one
+
+        self.sessions[username] = session
+        self.schedule_idle_lock()
+        # the session is locked by the idle timer if it isn't used again within the session timeout
+        return session
+
+    def get_session(self, username):
+        """This function retrieves the user's cached session, unlocking the vault if it hasn't been unlocked yet or the session has been
+        idle for longer than the session timeout. Idle sessions are also locked in the background by 'lock_idle_sessions', so a user who
+        walks away doesn't leave their key cached until the next vault call.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+
+        Returns:
+            dict: Returns the session containing the user id, Fernet object and the time it was last used
+        """
+        session = self.sessions.get(username)
+
+        if session is None or session["last_used"] + SESSION_IDLE_TIMEOUT < time.time():
+            self.lock_vault(username)
+            session = self.unlock_vault(username)
+        # evicts idle sessions and resolves the key again
+
+        session["last_used"] = time.time()
+        return session
+
+    def schedule_idle_lock(self):
+        """This function starts the idle timer, set to fire when the least recently used session reaches the session timeout. It does
+        nothing if the timer is already running or no vault is unlocked."""
+        with self.idle_lock:
+            if self.idle_timer is not None:
+                return
+            last_used = [session["last_used"] for session in list(self.sessions.values())]
+            if not last_used:
+                return
+            delay = max(min(last_used) + SESSION_IDLE_TIMEOUT - time.time(), 0)
+            self.idle_timer = threading.Timer(delay, self.lock_idle_sessions)
+            self.idle_timer.daemon = True
+            self.idle_timer.start()
+
+    def lock_idle_sessions(self):
+        """This function locks the vault of every user whose session has been idle for longer than the session timeout, and is called by
+        the idle timer. The timer is started again for the sessions which are still unlocked.
+
+        Returns:
+            int: Returns the number of sessions locked
+        """
+        with self.idle_lock:
+            self.idle_timer = None
+
+        locked = 0
+        now = time.time()
+        for username, session in list(self.sessions.items()):
+            if session["last_used"] + SESSION_IDLE_TIMEOUT < now and self.sessions.get(username) is session:
+                locked += self.lock_vault(username)
+        # a session unlocked again since the list was taken is left alone
+
+        self.schedule_idle_lock()
+        return locked
+
+    def lock_vault(self, username):
+        """This function locks the user's password vault by evicting their cached user id and Fernet object from the session cache.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+
+        Returns:
+            Boolean: Returns True if a session was evicted, otherwise it returns False
+        """
+        self.reveal_cache.wipe(username)
+        # the user's revealed passwords are wiped with their session
+        return self.sessions.pop(username, None) is not None
+
     def website_exists(self, username, website):
         """This function checks whether or not the website entered by the user exists within the password vault database.
 
@@ -240,39 +1286,291 @@ class MambaPasswordVaultDB:
             boolean: Returns True if the website was found, otherwise it returns False.
         """
         
-        # retrieves user id from username
-        user_id = self.get_user_id(username)
+        # retrieves user id from the session
+        user_id = self.get_session(username)["user_id"]
         # queries database for website if it exists
-        self.cur.execute(
-            "SELECT * FROM passwords WHERE user_id=? AND website=?", (user_id, website)
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT 1 FROM passwords WHERE user_id=? AND website=?", (user_id, website)
         )
         # returns True if website exists, otherwise it returns False
-        return self.cur.fetchone() is not None
+        return cur.fetchone() is not None
 
-    def export_passwords(self, username):
-        """This function allows a user to export all of their passwords from the password vault to a JSON file.
+    def export_passwords(self, username, file_path=None, progress=None):
+        """This function allows a user to export all of their passwords from the password vault to a JSON file. The passwords are streamed
+        from the database and decrypted a page at a time, and each one is written to the file as soon as it is decrypted, so memory use stays
+        bounded however large the vault is. The file is written to a temporary file first and then renamed, so an interrupted export never
+        leaves a partial file behind.
 
         Args:
             username (str): The username associated to the user's Mamba account
+            file_path (str): The file to export to, which defaults to '{username}_passwords.json'
+            progress (callable): Called with the number of passwords written so far after each one is written
 
         Returns:
-            Boolean: True if the passwords have been exported as a JSON file
+            Boolean: True if the passwords have been exported as a JSON file, False if there are no passwords to export
         """
+        file_path = file_path or f"{username}_passwords.json"
+        written = 0
 
-        # retrieves all passwords with the 'view_passwords' function
-        passwords = self.view_passwords(username)
-
-        # Convert passwords to JSON
-        json_passwords = json.dumps(passwords)
+        # Write to a temporary file in the same folder, so it can be renamed over the export file
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(file_path)), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write("[")
+                for entry in self.iter_passwords(username, page_size=BULK_BATCH_SIZE):
+                    if written:
+                        f.write(", ")
+                    f.write(json.dumps({"website": entry["website"], "password": entry["password"]}))
+                    # writes each password as an element of the JSON array
+                    written += 1
+                    if progress:
+                        progress(written)
+                f.write("]")
+                f.flush()
+                os.fsync(f.fileno())
+                # the file's contents are on disk before it is renamed, so a power cut can't leave an empty or truncated export
 
-        if json_passwords != "[]":
-            # Write to file
-            with open(f"{username}_passwords.json", "w") as f:
-                f.write(json_passwords)
+            if written:
+                os.replace(temp_path, file_path)
                 return True
-        else:
+            # the export file is only replaced once every password has been written
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            # removes the temporary file if there was nothing to export or the export failed
+
+        return False
+
+
+    def get_replica_id(self):
+        """This function retrieves the unique replica id of this vault file, which identifies the changes made in it when syncing.
+
+        Returns:
+            str: Returns the replica id
+        """
+        cur = self.conn.cursor()
+        cur.execute("SELECT replica_id FROM sync_replicas WHERE local=1")
+        return cur.fetchone()[0]
+
+    def get_keys_by_user_id(self, user_id):
+        """This function retrieves a user's master key from this vault file by their user id, as a list of keys with the newest first if a
+        key rotation is in progress.
+
+        Args:
+            user_id (str): The user id of the user's account
+
+        Returns:
+            bytes or list: Returns the master key or keys, or None if the user has no master key in this vault
+        """
+        cur = self.conn.cursor()
+        cur.execute("SELECT key, new_key FROM keys WHERE user_id=?", (user_id,))
+        row = cur.fetchone()
+
+        if row is None or not row[0]:
+            return None
+        return [row[1], row[0]] if row[1] else row[0]
+
+    def sync(self, other_db_path):
+        """This function syncs this password vault with another copy of the password vault database file, such as one used on another
+        workstation. Only the changes made in each vault since the last sync between them are exchanged, using their change journals, so
+        the cost of a sync depends on the number of changes rather than the size of the vaults. When the same entry has been changed in
+        both vaults, the change with the latest time wins, with ties broken by the replica id and sequence number of the vault it was made
+        in, so both vaults always end up with the same entries. Passwords are re-encrypted with the receiving vault's master key, and a user
+        who has no master key in the receiving vault yet, such as one created after the vault file was copied, is given the other vault's.
+
+        Args:
+            other_db_path (str): The path of the other password vault database file
+
+        Returns:
+            tuple: Returns the number of changes applied to this vault, and the number applied to the other vault
+        """
+        other = MambaPasswordVaultDB(
+            crypto_engine=self.crypto_engine,
+            profile=self.pool.profile,
+            path=other_db_path,
+            accounts_path=self.pool.attachments["accounts"],
+        )
+        # the other vault uses this vault's account database, as attaching a missing file would create an empty one
+        try:
+            other.create_mamba_password_vault_table()
+            # makes sure the other vault has a change journal
+
+            if other.get_replica_id() == self.get_replica_id():
+                cur = self.conn.cursor()
+                cur.execute(
+                    "UPDATE sync_replicas SET replica_id=? WHERE local=1",
+                    (str(uuid.uuid4()),),
+                )
+                self.conn.commit()
+            # a vault file which was copied by hand has the same replica id as the original, so this vault is given a new one
+
+            pulled = self.pull_changes(other)
+            pushed = other.pull_changes(self)
+        finally:
+            other.pool.close_all()
+
+        return pulled, pushed
+
+    def pull_changes(self, source, batch_size=SYNC_BATCH_SIZE):
+        """This function applies the changes in another vault's change journal which this vault hasn't pulled yet. Changes are read in
+        batches in sequence order, and each batch is committed together with the last sequence number pulled, so an interrupted pull
+        carries on where it stopped.
+
+        Args:
+            source (MambaPasswordVaultDB): The vault to pull changes from
+            batch_size (int): The number of journal entries applied per transaction
+
+        Returns:
+            int: Returns the number of changes applied
+        """
+        source_replica_id = source.get_replica_id()
+        cur = self.conn.cursor()
+        source_cur = source.conn.cursor()
+
+        cur.execute(
+            "INSERT OR IGNORE INTO sync_replicas (replica_id) VALUES (?)",
+            (source_replica_id,),
+        )
+        cur.execute(
+            "SELECT last_seq FROM sync_replicas WHERE replica_id=?", (source_replica_id,)
+        )
+        last_seq = cur.fetchone()[0]
+        applied = 0
+        keys = {}
+        self.pool.flush_connection(self.conn)
+        # commits any writes left pending by group commit, so rolling back a failed pull can't undo them
+
+        try:
+            while True:
+                source_cur.execute(
+                    "SELECT seq, user_id, website, changed_at, origin, COALESCE(origin_seq, seq), deleted FROM change_journal WHERE seq>? ORDER BY seq LIMIT ?",
+                    (last_seq, batch_size),
+                )
+                changes = source_cur.fetchall()
+                if not changes:
+                    break
+
+                for seq, user_id, website, changed_at, origin, origin_seq, deleted in changes:
+                    if self.apply_change(cur, source, keys, user_id, website, changed_at, origin, origin_seq, deleted):
+                        applied += 1
+                # changes which were first made in this vault are already its latest change to the entry, so they are never applied back
+                # to it, while changes made in a hand copied vault under the same replica id before their first sync are still applied
+
+                last_seq = changes[-1][0]
+                cur.execute(
+                    "UPDATE sync_replicas SET last_seq=? WHERE replica_id=?",
+                    (last_seq, source_replica_id),
+                )
+                self.conn.commit()
+                # the batch and the last sequence number pulled are committed together
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        self.sessions.clear()
+        self.reveal_cache.wipe()
+        # sessions are unlocked again, and passwords decrypted again, in case the vault changed underneath them
+        return applied
+
+    def apply_change(self, cur, source, keys, user_id, website, changed_at, origin, origin_seq, deleted):
+        """This function applies a single change from another vault's change journal, if it is newer than the latest change to the same
+        entry in this vault, without committing.
+
+        Args:
+            cur (sqlite3.Cursor): The cursor for this vault
+            source (MambaPasswordVaultDB): The vault the change came from
+            keys (dict): The master keys of each user, cached as (source key, local key) pairs for the duration of the pull
+            user_id (str): The user id of the entry
+            website (str): The website of the entry
+            changed_at (int): The time the change was made
+            origin (str): The replica id of the vault the change was first made in
+            origin_seq (int): The sequence number of the change in the vault it was first made in
+            deleted (int): 1 if the change deleted the entry, otherwise 0
+
+        Returns:
+            Boolean: Returns True if the change was applied, or False if this vault already has a newer change
+
+        Raises:
+            ValueError: Raises a value error if the other vault has the password but no master key to decrypt it, so the pull stops
+                before the change instead of skipping it
+        """
+        cur.execute(
+            "SELECT changed_at, origin, COALESCE(origin_seq, seq) FROM change_journal WHERE user_id=? AND website=? ORDER BY seq DESC LIMIT 1",
+            (user_id, website),
+        )
+        latest = cur.fetchone()
+        if latest is not None and tuple(latest) >= (changed_at, origin, origin_seq):
             return False
+        # the latest change wins, ordered by time, then replica id, then sequence number
+
+        if deleted:
+            encrypted_pwd = None
+        else:
+            source_cur = source.conn.cursor()
+            source_cur.execute(
+                "SELECT encrypted_password FROM passwords WHERE user_id=? AND website=?",
+                (user_id, website),
+            )
+            row = source_cur.fetchone()
+            if row is None:
+                return False
+            # the entry has since been deleted in the other vault, which a later change in its journal will apply
+
+            if user_id not in keys:
+                keys[user_id] = (source.get_keys_by_user_id(user_id), self.get_keys_by_user_id(user_id))
+            source_key, local_key = keys[user_id]
+            if source_key is None:
+                raise ValueError(f"The other vault has no master key for user {user_id}, so their passwords can't be synced")
+
+            if local_key is None:
+                local_key = source_key[0] if isinstance(source_key, list) else source_key
+                cur.execute("INSERT INTO keys (user_id, key) VALUES (?, ?)", (user_id, local_key))
+                keys[user_id] = (source_key, local_key)
+            # a user without a master key in this vault is given the other vault's newest key, committed with the batch
+            encrypted_pwd = make_fernet(local_key).encrypt(make_fernet(source_key).decrypt(row[0]))
+            # re-encrypts the password with this vault's master key
+
+        cur.execute(
+            "INSERT INTO journal_context (origin, origin_seq, changed_at) VALUES (?, ?, ?)",
+            (origin, origin_seq, changed_at),
+        )
+        # the change is journaled in this vault under the vault it was first made in, so it can be passed on to other vaults
+
+        if deleted:
+            cur.execute(
+                "DELETE FROM passwords WHERE user_id=? AND website=? RETURNING id",
+                (user_id, website),
+            )
+            if cur.fetchone() is None:
+                cur.execute(
+                    "INSERT INTO change_journal (user_id, website, changed_at, origin, origin_seq, deleted) VALUES (?, ?, ?, ?, ?, 1)",
+                    (user_id, website, changed_at, origin, origin_seq),
+                )
+            # the tombstone is still journaled if the entry never existed here
+        else:
+            cur.execute(
+                """
+        INSERT INTO passwords (user_id, website, encrypted_password, created_at, updated_at) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, website) DO UPDATE SET encrypted_password=excluded.encrypted_password, updated_at=excluded.updated_at
+        """,
+                (user_id, website, encrypted_pwd, changed_at, changed_at),
+            )
+
+        cur.execute("DELETE FROM journal_context")
+        return True
+
+def __getattr__(name):
+    """This function resolves the module's 'account_db' and 'password_db' objects to the shared databases in the registry the first
+    time they are used, so importing this module doesn't create any database objects."""
+    if name == "account_db":
+        from mamba_database_registry import get_account_db
 
+        return get_account_db()
+    if name == "password_db":
+        from mamba_database_registry import get_password_vault_db
 
-account_db = MambaAccountDB()
-password_db = MambaPasswordVaultDB()
+        return get_password_vault_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,328 @@
+# Mamba Password Manager - Query Profiler
+
+# Modules
+import bisect
+import functools
+import inspect
+import logging
+import logging.handlers
+import sqlite3
+import threading
+import time
+
+# Constants
+SLOW_QUERY_MS = 50
+SLOW_QUERY_LOG = "mamba_slow_queries.log"
+SLOW_QUERY_LOG_MAX_BYTES = 1048576
+SLOW_QUERY_LOG_BACKUP_COUNT = 3
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+# the upper bound of each histogram bucket, with a final bucket for anything slower
+OUTSIDE_METHOD = "(outside)"
+
+
+class LatencyHistogram:
+    def __init__(self):
+        """This function initialises the 'LatencyHistogram' class, which counts latencies in the buckets of 'LATENCY_BUCKETS_MS'."""
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+
+    def add(self, ms):
+        """This function adds a latency to the histogram.
+
+        Args:
+            ms (float): The latency in milliseconds
+        """
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.total_ms += ms
+
+    def to_dict(self):
+        """This function converts the histogram to a dictionary of bucket counts, keyed by the upper bound of each bucket.
+
+        Returns:
+            dict: Returns the count and total latency, and the count in each bucket
+        """
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": sum(self.counts),
+            "total_ms": self.total_ms,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """A cursor which times every statement it executes and reports it to the connection's profiler."""
+
+    def record(self, sql, start):
+        profiler = self.connection.profiler
+        if profiler is not None:
+            profiler.record_query(sql, time.perf_counter() - start)
+        # the pragmas run while the connection is opened are run before the profiler is attached
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.record(sql, start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.record(sql, start)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self.record(sql_script, start)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """A connection whose cursors, including the ones created by its 'execute' shortcuts, time every statement."""
+
+    profiler = None
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# Mamba Password Manager - Query Profiler Class
+class MambaQueryProfiler:
+    def __init__(
+        self,
+        slow_query_ms=SLOW_QUERY_MS,
+        log_path=SLOW_QUERY_LOG,
+        max_bytes=SLOW_QUERY_LOG_MAX_BYTES,
+        backup_count=SLOW_QUERY_LOG_BACKUP_COUNT,
+    ):
+        """This function initialises the 'MambaQueryProfiler' class, an opt-in instrumentation layer for the database classes. It counts the
+        SQL statements run by each public method, including statements run by triggers, records latency histograms for each method and
+        statement, and writes statements slower than a threshold to a rotating log file.
+
+        Profiling is switched on per database object with 'instrument', which must be called before the object opens any connections.
+        Database objects which aren't instrumented use plain connections and unwrapped methods, so the profiler costs nothing when it is
+        disabled. Only the SQL text is ever logged, never the parameters, as they contain passwords and master keys.
+
+        Args:
+            slow_query_ms (float): Statements taking longer than this many milliseconds are written to the slow query log
+            log_path (str): The path of the slow query log file
+            max_bytes (int): The size the log file is rotated at
+            backup_count (int): The number of rotated log files kept
+        """
+        self.slow_query_ms = slow_query_ms
+        self.local = threading.local()
+        # holds the public method each thread is currently running
+        self.lock = threading.Lock()
+        # guards the statistics, which are updated from every thread
+        self.method_calls = {}
+        self.method_queries = {}
+        self.method_statements = {}
+        self.method_latency = {}
+        self.query_latency = {}
+        self.slow_queries = 0
+
+        self.logger = logging.getLogger(f"mamba.slow_queries.{id(self)}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.handler = logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=max_bytes, backupCount=backup_count, delay=True
+        )
+        # the log file is only created once the first slow query is written
+        self.handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self.logger.addHandler(self.handler)
+
+    def instrument(self, db):
+        """This function switches profiling on for a database object, wrapping each of its public methods and making its connection pool
+        open profiled connections.
+
+        Args:
+            db (object): A 'MambaAccountDB', 'MambaPasswordVaultDB' or 'MambaShardedPasswordVaultDB' object which hasn't opened any
+                connections yet
+
+        Returns:
+            object: Returns the same database object
+        """
+        pool = getattr(db, "pool", None)
+        if pool is not None:
+            pool.profiler = self
+        else:
+            db.profiler = self
+        # a sharded vault has a pool per shard file, so it passes the profiler on to each pool as the shard is opened
+        for name, _ in inspect.getmembers(type(db), inspect.isfunction):
+            if not name.startswith("_"):
+                setattr(db, name, self.wrap_method(f"{type(db).__name__}.{name}", getattr(db, name)))
+        # the wrappers are set on the object rather than the class, so other objects of the same class aren't profiled
+        return db
+
+    def wrap_method(self, name, method):
+        """This function wraps a public method so the statements run while it is running are counted against it. When one public method
+        calls another, the statements are counted against the outermost one, which is the method the caller asked for.
+
+        Args:
+            name (str): The name the method's statistics are recorded under
+            method (callable): The bound method to wrap
+
+        Returns:
+            callable: Returns the wrapped method
+        """
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if getattr(self.local, "method", None) is not None:
+                return method(*args, **kwargs)
+
+            self.local.method = name
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                self.local.method = None
+                self.record_method(name, time.perf_counter() - start)
+
+            if inspect.isgenerator(result):
+                return self.wrap_generator(name, result)
+            # generators run their statements while they are iterated, after the method has returned
+            return result
+
+        return wrapper
+
+    def wrap_generator(self, name, generator):
+        """This function wraps a generator returned by a public method so the statements run while it is iterated are counted against
+        the method.
+
+        Yields:
+            object: Each item yielded by the generator
+        """
+        while True:
+            outer = getattr(self.local, "method", None)
+            self.local.method = outer or name
+            start = time.perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                self.local.method = outer
+                if outer is None:
+                    self.record_method(name, time.perf_counter() - start, call=False)
+            yield item
+
+    def connect_kwargs(self):
+        """This function returns the extra arguments passed to 'sqlite3.connect' for connections opened by an instrumented pool.
+
+        Returns:
+            dict: Returns the arguments which make the connection a 'ProfiledConnection'
+        """
+        return {"factory": ProfiledConnection}
+
+    def attach(self, conn):
+        """This function attaches the profiler to a connection opened by an instrumented pool, hooking its trace callback to count every
+        statement the connection runs.
+
+        Args:
+            conn (ProfiledConnection): The connection opened with 'connect_kwargs'
+        """
+        conn.profiler = self
+        conn.set_trace_callback(self.trace)
+
+    def current_method(self):
+        """This function retrieves the public method the current thread is running."""
+        return getattr(self.local, "method", None) or OUTSIDE_METHOD
+
+    def trace(self, statement):
+        """This function is the trace callback of every profiled connection, called by SQLite for each statement it runs, including the
+        statements inside triggers. The statement text is only counted, as SQLite passes it with the parameters filled in.
+
+        Args:
+            statement (str): The statement being run
+        """
+        method = self.current_method()
+        with self.lock:
+            self.method_queries[method] = self.method_queries.get(method, 0) + 1
+
+    def record_method(self, name, seconds, call=True):
+        """This function records the latency of a call to a public method, or of one step of the generator it returned.
+
+        Args:
+            name (str): The name of the method
+            seconds (float): The time taken in seconds
+            call (Boolean): True if this is a new call to the method, False if it continues an earlier call
+        """
+        with self.lock:
+            if call:
+                self.method_calls[name] = self.method_calls.get(name, 0) + 1
+            self.method_latency.setdefault(name, LatencyHistogram()).add(seconds * 1000)
+
+    def record_query(self, sql, seconds):
+        """This function records the latency of a statement executed by a profiled cursor, and writes it to the slow query log if it took
+        longer than the threshold.
+
+        Args:
+            sql (str): The SQL text of the statement, without its parameters
+            seconds (float): The time taken in seconds
+        """
+        ms = seconds * 1000
+        statement = " ".join(sql.split())
+        # collapses the whitespace of multi-line statements so each one is recorded and logged on a single line
+        method = self.current_method()
+        with self.lock:
+            self.method_statements[method] = self.method_statements.get(method, 0) + 1
+            self.query_latency.setdefault(statement, LatencyHistogram()).add(ms)
+            slow = ms > self.slow_query_ms
+            if slow:
+                self.slow_queries += 1
+        if slow:
+            self.logger.info("%.1fms %s %s", ms, method, statement)
+
+    def report(self):
+        """This function summarises everything the profiler has recorded.
+
+        Returns:
+            dict: Returns the calls, executed statements, traced queries, queries per call and latency histogram of each public method,
+            the latency histogram of each statement, and the number of slow statements. Traced queries also include the statements run
+            by triggers and by SQLite itself, such as the FTS5 index updates
+        """
+        with self.lock:
+            methods = {}
+            for name in sorted(set(self.method_calls) | set(self.method_queries)):
+                calls = self.method_calls.get(name, 0)
+                queries = self.method_queries.get(name, 0)
+                methods[name] = {
+                    "calls": calls,
+                    "statements": self.method_statements.get(name, 0),
+                    "queries": queries,
+                    "queries_per_call": queries / calls if calls else None,
+                    "latency": self.method_latency[name].to_dict() if name in self.method_latency else None,
+                }
+            return {
+                "methods": methods,
+                "queries": {sql: histogram.to_dict() for sql, histogram in self.query_latency.items()},
+                "slow_queries": self.slow_queries,
+            }
+
+    def close(self):
+        """This function writes a summary of each method's statements to the log and closes the log file."""
+        for name, summary in self.report()["methods"].items():
+            if summary["calls"]:
+                self.logger.info(
+                    "summary %s calls=%d statements=%d queries=%d total=%.1fms",
+                    name,
+                    summary["calls"],
+                    summary["statements"],
+                    summary["queries"],
+                    summary["latency"]["total_ms"],
+                )
+        self.handler.close()
+        self.logger.removeHandler(self.handler)
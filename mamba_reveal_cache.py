@@ -0,0 +1,199 @@
+# Mamba Password Manager - Reveal Cache
+
+# Modules
+import os
+import threading
+import time
+from collections import OrderedDict
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# Constants
+REVEAL_CACHE_SIZE = 64
+REVEAL_CACHE_TTL = 60
+
+
+# Mamba Password Manager - Reveal Cache Class
+class MambaRevealCache:
+    def __init__(self, max_entries=REVEAL_CACHE_SIZE, ttl=REVEAL_CACHE_TTL):
+        """This function initialises the 'MambaRevealCache' class, a bounded cache of recently revealed passwords so revealing the same
+        entry again doesn't query and decrypt it every time. Once the cache is full the least recently revealed entry is evicted, and each
+        entry expires 'ttl' seconds after it was decrypted however often it is revealed. Expired entries are dropped by a timer, so a
+        session which is left alone doesn't keep its passwords in the cache.
+
+        Cached passwords are encrypted with AES-GCM under a random key which only exists in this object's memory, and is replaced whenever
+        the whole cache is wiped. This keeps the cache's entries from exposing passwords on their own, but the key is held in the same
+        process, so it doesn't protect against anything which can read the whole process's memory.
+
+        Args:
+            max_entries (int): The maximum number of revealed passwords kept, or 0 to disable the cache
+            ttl (float): The number of seconds a revealed password is kept for
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.aead = AESGCM(AESGCM.generate_key(bit_length=128))
+        # encrypts the cached passwords with a key which is never stored
+        self.entries = OrderedDict()
+        # stores each revealed password's expiry time, nonce and ciphertext keyed by username and entry id, least recently revealed first
+        self.expiry_order = OrderedDict()
+        # the same keys in the order they were decrypted, which is the order they expire in as every entry has the same ttl
+        self.generation = 0
+        # incremented by every invalidation and wipe, so a password read before one of them is never cached after it
+        self.lock = threading.Lock()
+        # guards the entries and counters, as the vault is shared by every thread
+        self.expiry_timer = None
+        # the timer which drops expired passwords, running while any are cached
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # counters used to tune the size and ttl of the cache
+
+    def get(self, username, entry_id):
+        """This function retrieves a revealed password from the cache.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+            entry_id (int): The id of the entry
+
+        Returns:
+            str: Returns the password, or None if it isn't cached or has expired
+        """
+        key = (username, entry_id)
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is not None and entry[0] <= time.monotonic():
+                self.drop(key)
+                self.expirations += 1
+                entry = None
+            # expired passwords are dropped and decrypted again
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            _, nonce, ciphertext = entry
+            return self.aead.decrypt(nonce, ciphertext, repr(key).encode()).decode()
+
+    def put(self, username, entry_id, password, generation):
+        """This function adds a revealed password to the cache, evicting the least recently revealed passwords once it is full. The password
+        isn't cached if the entry may have changed since it was read.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+            entry_id (int): The id of the entry
+            password (str): The decrypted password
+            generation (int): The cache's 'generation' from before the password was read from the vault
+        """
+        if self.max_entries <= 0:
+            return
+
+        key = (username, entry_id)
+        nonce = os.urandom(12)
+        ciphertext = self.aead.encrypt(nonce, password.encode(), repr(key).encode())
+        # the ciphertext is bound to the entry, so it can't be returned for another one
+
+        with self.lock:
+            if generation != self.generation:
+                return
+            # an invalidation or wipe happened while the password was being read, so it may be out of date
+
+            if key in self.entries:
+                self.drop(key)
+            self.entries[key] = (time.monotonic() + self.ttl, nonce, ciphertext)
+            self.expiry_order[key] = None
+
+            self.drop_expired()
+            while len(self.entries) > self.max_entries:
+                self.drop(next(iter(self.entries)))
+                self.evictions += 1
+
+            if self.expiry_timer is None and self.entries:
+                self.schedule_expiry()
+
+    def invalidate(self, username, entry_id):
+        """This function drops a password from the cache, and is called when the entry is updated or deleted.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+            entry_id (int): The id of the entry
+        """
+        with self.lock:
+            self.generation += 1
+            if (username, entry_id) in self.entries:
+                self.drop((username, entry_id))
+                self.invalidations += 1
+
+    def wipe(self, username=None):
+        """This function wipes every cached password of a user, and is called when their vault is locked by logging out or being idle.
+
+        Args:
+            username (str): The username associated to the user's Mamba account, or None to wipe every user's passwords
+        """
+        with self.lock:
+            self.generation += 1
+            if username is not None:
+                for key in [cached for cached in self.entries if cached[0] == username]:
+                    self.drop(key)
+                return
+
+            self.entries.clear()
+            self.expiry_order.clear()
+            self.aead = AESGCM(AESGCM.generate_key(bit_length=128))
+            # a new key makes any copies of the old ciphertexts useless
+            if self.expiry_timer is not None:
+                self.expiry_timer.cancel()
+                self.expiry_timer = None
+
+    def drop(self, key):
+        """This function removes a password from the cache. The lock must be held by the caller."""
+        del self.entries[key]
+        del self.expiry_order[key]
+
+    def drop_expired(self):
+        """This function drops the passwords which have expired, stopping at the first which hasn't. The lock must be held by the caller."""
+        now = time.monotonic()
+        while self.expiry_order and self.entries[next(iter(self.expiry_order))][0] <= now:
+            self.drop(next(iter(self.expiry_order)))
+            self.expirations += 1
+
+    def schedule_expiry(self):
+        """This function starts the expiry timer, set to fire when the oldest cached password expires. The lock must be held by the
+        caller."""
+        delay = max(self.entries[next(iter(self.expiry_order))][0] - time.monotonic(), 0)
+        self.expiry_timer = threading.Timer(delay, self.expire)
+        self.expiry_timer.daemon = True
+        self.expiry_timer.start()
+
+    def expire(self):
+        """This function drops the expired passwords, and is called by the expiry timer. The timer is started again for the passwords
+        which are still cached."""
+        with self.lock:
+            self.expiry_timer = None
+            self.drop_expired()
+            if self.entries:
+                self.schedule_expiry()
+
+    def stats(self):
+        """This function retrieves the cache's counters, so its size and ttl can be tuned.
+
+        Returns:
+            dict: Returns the number of hits, misses, evictions, expirations and invalidations, the hit rate, and the number of passwords
+                cached out of the maximum
+        """
+        with self.lock:
+            self.drop_expired()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "size": len(self.entries),
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,147 @@
+# Mamba Password Manager - Schema Migrations
+
+# Constants
+MIGRATION_BATCH_SIZE = 5000
+
+
+# Mamba Password Manager - Migration Class
+class MambaMigration:
+    def __init__(self, version, description, apply, backfill=None):
+        """This function initialises the 'MambaMigration' class, a single step which upgrades a database file's schema by one version.
+
+        Args:
+            version (int): The schema version the database file is at once the step has been applied
+            description (str): A short description of the step
+            apply (callable): Called with a cursor to change the schema. It returns the highest row id the backfill has to process, or
+                None if there is nothing to backfill
+            backfill (callable): Called with a cursor, the last row id processed, the highest row id to process and the batch size to
+                fill in one batch of rows. It returns the last row id it processed, or None once there are no rows left
+        """
+        self.version = version
+        self.description = description
+        self.apply = apply
+        self.backfill = backfill
+
+
+# Mamba Password Manager - Migration Runner Class
+class MambaMigrationRunner:
+    def __init__(self, migrations, batch_size=MIGRATION_BATCH_SIZE):
+        """This function initialises the 'MambaMigrationRunner' class, which upgrades a database file to the latest schema version. The
+        version a file is at is stored in its 'user_version' header, so each migration only ever runs once per file.
+
+        Each schema change runs in its own transaction together with the version bump, so a file is never left half migrated. Migrations
+        which fill in existing rows do so in batches, each committed together with its progress, so upgrading a large vault doesn't hold
+        a write lock for minutes and an interrupted upgrade carries on where it stopped the next time Mamba starts.
+
+        Args:
+            migrations (list): The 'MambaMigration' steps, in any order
+            batch_size (int): The number of rows filled in per transaction by a backfill
+        """
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+        self.batch_size = batch_size
+
+    def get_version(self, conn):
+        """This function retrieves the schema version of the main database file on a connection.
+
+        Args:
+            conn (sqlite3.Connection): The connection to the database file
+
+        Returns:
+            int: Returns the schema version, which is 0 for a new file or a file created before versioning
+        """
+        return conn.execute("PRAGMA main.user_version").fetchone()[0]
+
+    def migrate(self, conn, progress=None):
+        """This function applies every migration newer than the database file's schema version, in order.
+
+        Args:
+            conn (sqlite3.Connection): The connection to the database file
+            progress (callable): Called with the migration's version, the last row id filled in and the highest row id to fill in after
+                each backfill batch is committed
+
+        Returns:
+            tuple: Returns the schema version before and after migrating
+        """
+        cur = conn.cursor()
+        cur.execute(
+            """
+        CREATE TABLE IF NOT EXISTS main.schema_backfills (
+        version INTEGER PRIMARY KEY,
+        after_id INTEGER NOT NULL DEFAULT 0,
+        up_to INTEGER NOT NULL
+        )
+        """
+        )
+        # stores the progress of each backfill which hasn't finished yet
+        start_version = self.get_version(conn)
+
+        for migration in self.migrations:
+            if migration.version <= self.get_version(conn):
+                continue
+
+            cur.execute(
+                "SELECT after_id, up_to FROM main.schema_backfills WHERE version=?",
+                (migration.version,),
+            )
+            backfill = cur.fetchone()
+
+            if backfill is None:
+                try:
+                    cur.execute("BEGIN IMMEDIATE")
+                    up_to = migration.apply(cur)
+                    if up_to is not None and migration.backfill is not None:
+                        cur.execute(
+                            "INSERT INTO main.schema_backfills (version, up_to) VALUES (?, ?)",
+                            (migration.version, up_to),
+                        )
+                        backfill = (0, up_to)
+                    else:
+                        cur.execute(f"PRAGMA main.user_version = {int(migration.version)}")
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            # the schema change is committed with either the new version, or the start of its backfill
+            # a backfill which was interrupted part way through carries on from its last committed batch
+
+            if backfill is not None:
+                self.run_backfill(conn, migration, *backfill, progress)
+
+        return start_version, self.get_version(conn)
+
+    def run_backfill(self, conn, migration, after_id, up_to, progress=None):
+        """This function fills in the existing rows for a migration in batches, bumping the schema version once every row is filled in.
+
+        Args:
+            conn (sqlite3.Connection): The connection to the database file
+            migration (MambaMigration): The migration whose backfill is run
+            after_id (int): The last row id which has already been filled in
+            up_to (int): The highest row id to fill in, as rows added after the migration are handled by the new schema
+            progress (callable): Called with the migration's version, the last row id filled in and the highest row id after each batch
+        """
+        cur = conn.cursor()
+        while True:
+            try:
+                cur.execute("BEGIN IMMEDIATE")
+                last_id = migration.backfill(cur, after_id, up_to, self.batch_size)
+                if last_id is None:
+                    cur.execute(
+                        "DELETE FROM main.schema_backfills WHERE version=?", (migration.version,)
+                    )
+                    cur.execute(f"PRAGMA main.user_version = {int(migration.version)}")
+                else:
+                    cur.execute(
+                        "UPDATE main.schema_backfills SET after_id=? WHERE version=?",
+                        (last_id, migration.version),
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            # each batch is committed together with its progress
+
+            if last_id is None:
+                return
+            after_id = last_id
+            if progress:
+                progress(migration.version, after_id, up_to)
@@ -0,0 +1,359 @@
+# Mamba Password Manager - Sharded Password Vault Database
+
+# Modules
+import contextlib
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from mamba_database_connection import DEFAULT_PROFILE
+from mamba_password_vault_database import (
+    MambaPasswordVaultDB,
+    ACCOUNT_DB_PATH,
+    CONFLICT_SAMPLE_SIZE,
+    HISTORY_MAX_AGE,
+    HISTORY_MAX_VERSIONS,
+    HISTORY_PRUNE_BATCH_SIZE,
+    ROTATION_BATCH_SIZE,
+    SEARCH_LIMIT,
+    VIEW_PAGE_SIZE,
+)
+from mamba_crypto_engine import MambaCryptoEngine
+from mamba_reveal_cache import REVEAL_CACHE_SIZE, REVEAL_CACHE_TTL
+
+# Constants
+SHARD_DIR = "mamba_password_vault_shards"
+MAX_OPEN_SHARDS = 16
+PER_USER_SHARDS = "user"
+
+
+# Mamba Password Manager - Sharded Password Vault Database Class
+class MambaShardedPasswordVaultDB:
+    def __init__(
+        self,
+        shards=PER_USER_SHARDS,
+        shard_dir=SHARD_DIR,
+        max_open_shards=MAX_OPEN_SHARDS,
+        crypto_engine=None,
+        profile=DEFAULT_PROFILE,
+        history_max_versions=HISTORY_MAX_VERSIONS,
+        history_max_age=HISTORY_MAX_AGE,
+        accounts_path=ACCOUNT_DB_PATH,
+        group_commit=None,
+        reveal_cache_size=REVEAL_CACHE_SIZE,
+        reveal_cache_ttl=REVEAL_CACHE_TTL,
+    ):
+        """This function initialises the 'MambaShardedPasswordVaultDB' class, an optional storage mode with the same methods as
+        'MambaPasswordVaultDB' which spreads the password vault across several database files. Each user's entries and master key live in
+        one shard file, either a file of their own or one of a fixed number of files chosen by a hash of their username, so users no
+        longer share a B-tree or a write lock and writes from different users can run at the same time.
+
+        Shard files are only opened the first time a user in them is used, and are upgraded to the latest schema when they are opened.
+        At most 'max_open_shards' shard files are kept open, closing the least recently used one that isn't in use when another is opened.
+
+        Args:
+            shards (str or int): Either 'user' for a shard file per user, or the number of hash partitioned shard files
+            shard_dir (str): The directory the shard files are kept in
+            max_open_shards (int): The maximum number of shard files kept open when they aren't in use
+            crypto_engine (MambaCryptoEngine): The engine used for bulk encryption, which is shared by every shard
+            profile (str): The connection profile used to tune the database connections, either 'safe' or 'fast'
+            history_max_versions (int): The number of previous passwords kept for each entry
+            history_max_age (int): The number of seconds previous passwords are kept for by 'prune_history', or None to keep them forever
+            accounts_path (str): The path of the account database file
+            group_commit (MambaGroupCommit): The group commit settings used by every shard, or None to commit each write straight away
+            reveal_cache_size (int): The maximum number of revealed passwords cached by each open shard, or 0 to decrypt every reveal
+            reveal_cache_ttl (float): The number of seconds a revealed password is cached for
+        """
+        if shards != PER_USER_SHARDS and (not isinstance(shards, int) or shards < 1):
+            raise ValueError(f"Unknown shard mode: {shards}, use '{PER_USER_SHARDS}' or a number of shards")
+
+        self.shards = shards
+        self.shard_dir = shard_dir
+        self.max_open_shards = max_open_shards
+        self.crypto_engine = crypto_engine or MambaCryptoEngine()
+        self.profile = profile
+        self.history_max_versions = history_max_versions
+        self.history_max_age = history_max_age
+        self.accounts_path = accounts_path
+        self.group_commit = group_commit
+        self.reveal_cache_size = reveal_cache_size
+        self.reveal_cache_ttl = reveal_cache_ttl
+        self.profiler = None
+        # set by 'MambaQueryProfiler.instrument', and passed on to each shard's connection pool when it is opened
+        self.open_shards = OrderedDict()
+        # the open shard databases keyed by their path, from least to most recently used
+        self.in_use = {}
+        # the number of calls currently using each open shard, which can't be closed until it drops to 0
+        self.lock = threading.Lock()
+        # guards the open shards, which are shared by every thread
+
+    def get_shard_path(self, username):
+        """This function finds the shard file a user's vault is kept in. Usernames are hashed so shard file names don't reveal them, and
+        the hash is stable between runs so a user always maps to the same file.
+
+        Args:
+            username (str): The username associated to the user's Mamba account
+
+        Returns:
+            str: Returns the path of the user's shard file
+        """
+        digest = hashlib.sha256(username.encode()).digest()
+
+        if self.shards == PER_USER_SHARDS:
+            name = f"vault_{digest[:16].hex()}.db"
+        else:
+            name = f"shard_{int.from_bytes(digest[:8], 'big') % self.shards:04d}.db"
+        return os.path.join(self.shard_dir, name)
+
+    @contextlib.contextmanager
+    def shard(self, path):
+        """This function opens a shard file, or reuses it if it is already open, and marks it as in use until the 'with' block ends.
+
+        Args:
+            path (str): The path of the shard file
+
+        Yields:
+            MambaPasswordVaultDB: The password vault database for the shard file
+        """
+        with self.lock:
+            db = self.open_shards.get(path)
+
+            if db is None:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                db = MambaPasswordVaultDB(
+                    self.crypto_engine,
+                    self.profile,
+                    self.history_max_versions,
+                    self.history_max_age,
+                    path=path,
+                    accounts_path=self.accounts_path,
+                    group_commit=self.group_commit,
+                    reveal_cache_size=self.reveal_cache_size,
+                    reveal_cache_ttl=self.reveal_cache_ttl,
+                )
+                db.pool.profiler = self.profiler
+                db.create_mamba_password_vault_table()
+                # new shard files are created, and existing ones upgraded, before any other thread can use them
+                self.open_shards[path] = db
+                self.in_use[path] = 0
+
+            self.open_shards.move_to_end(path)
+            self.in_use[path] += 1
+
+        try:
+            yield db
+        finally:
+            with self.lock:
+                if path in self.in_use:
+                    self.in_use[path] -= 1
+                # the shard is no longer tracked if 'close_all' was called while it was in use
+                self.close_idle_shards()
+
+    def user_shard(self, username):
+        """This function opens the shard file a user's vault is kept in, for use in a 'with' block."""
+        return self.shard(self.get_shard_path(username))
+
+    def close_idle_shards(self):
+        """This function closes the least recently used shard files which aren't in use, until no more than 'max_open_shards' are open.
+        The lock must be held by the caller."""
+        for path in list(self.open_shards):
+            if len(self.open_shards) <= self.max_open_shards:
+                break
+            if self.in_use[path] == 0:
+                self.open_shards.pop(path).close_all()
+                del self.in_use[path]
+        # a closed shard's unlocked sessions and revealed passwords are dropped with it, and are unlocked again the next time the user is used
+
+    def shard_paths(self):
+        """This function lists the shard files which already exist.
+
+        Returns:
+            list: Returns the path of each shard file
+        """
+        if not os.path.isdir(self.shard_dir):
+            return []
+        return [
+            os.path.join(self.shard_dir, name)
+            for name in sorted(os.listdir(self.shard_dir))
+            if name.endswith(".db")
+        ]
+
+    def flush(self):
+        """This function commits every write left pending by group commit in the open shard files."""
+        with self.lock:
+            shards = list(self.open_shards.values())
+        for db in shards:
+            db.flush()
+
+    def close_all(self):
+        """This function closes every open shard file, and is called when the application closes."""
+        with self.lock:
+            shards, self.open_shards, self.in_use = self.open_shards, OrderedDict(), {}
+        for db in shards.values():
+            db.close_all()
+
+    def reveal_cache_stats(self):
+        """This function adds up the reveal cache counters of the open shard files. A shard's counters are lost when it is closed.
+
+        Returns:
+            dict: Returns the counters described by 'MambaRevealCache.stats', with the size and maximum summed across the open shards
+        """
+        with self.lock:
+            shards = list(self.open_shards.values())
+        totals = dict.fromkeys(("hits", "misses", "evictions", "expirations", "invalidations", "size", "max_entries"), 0)
+        for db in shards:
+            for name, value in db.reveal_cache_stats().items():
+                if name in totals:
+                    totals[name] += value
+        lookups = totals["hits"] + totals["misses"]
+        return {"hit_rate": totals["hits"] / lookups if lookups else 0.0, **totals}
+
+    def create_mamba_password_vault_table(self, progress=None):
+        """This function creates the directory the shard files are kept in. Each shard file's tables are created, or upgraded, when it is
+        first opened."""
+        os.makedirs(self.shard_dir, exist_ok=True)
+
+    def get_user_id(self, username):
+        """This function calls 'MambaPasswordVaultDB.get_user_id' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.get_user_id(username)
+
+    def get_user_id_and_key(self, username):
+        """This function calls 'MambaPasswordVaultDB.get_user_id_and_key' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.get_user_id_and_key(username)
+
+    def get_user_keys(self, username):
+        """This function calls 'MambaPasswordVaultDB.get_user_keys' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.get_user_keys(username)
+
+    def generate_master_key(self, username):
+        """This function calls 'MambaPasswordVaultDB.generate_master_key' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.generate_master_key(username)
+
+    def rotate_master_key(self, username, batch_size=ROTATION_BATCH_SIZE, progress=None):
+        """This function calls 'MambaPasswordVaultDB.rotate_master_key' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.rotate_master_key(username, batch_size, progress)
+
+    def add_password(self, username, website, password):
+        """This function calls 'MambaPasswordVaultDB.add_password' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.add_password(username, website, password)
+
+    def add_passwords(self, username, entries, commit_batches=False, max_conflicts=CONFLICT_SAMPLE_SIZE):
+        """This function calls 'MambaPasswordVaultDB.add_passwords' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.add_passwords(username, entries, commit_batches, max_conflicts)
+
+    def import_passwords(self, username, file_path):
+        """This function calls 'MambaPasswordVaultDB.import_passwords' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.import_passwords(username, file_path)
+
+    def view_passwords(self, username):
+        """This function calls 'MambaPasswordVaultDB.view_passwords' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.view_passwords(username)
+
+    def iter_passwords(self, username, page_size=VIEW_PAGE_SIZE, after_id=0):
+        """This function iterates 'MambaPasswordVaultDB.iter_passwords' on the user's shard, which stays open until the iteration ends."""
+        with self.user_shard(username) as db:
+            yield from db.iter_passwords(username, page_size, after_id)
+
+    def list_passwords(self, username, page_size=VIEW_PAGE_SIZE, after_id=0):
+        """This function iterates 'MambaPasswordVaultDB.list_passwords' on the user's shard, which stays open until the iteration ends."""
+        with self.user_shard(username) as db:
+            yield from db.list_passwords(username, page_size, after_id)
+
+    def reveal(self, username, entry_id):
+        """This function calls 'MambaPasswordVaultDB.reveal' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.reveal(username, entry_id)
+
+    def search(self, username, query, limit=SEARCH_LIMIT):
+        """This function calls 'MambaPasswordVaultDB.search' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.search(username, query, limit)
+
+    def update_password(self, username, website, new_password):
+        """This function calls 'MambaPasswordVaultDB.update_password' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.update_password(username, website, new_password)
+
+    def view_password_history(self, username, website):
+        """This function calls 'MambaPasswordVaultDB.view_password_history' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.view_password_history(username, website)
+
+    def prune_history(self, batch_size=HISTORY_PRUNE_BATCH_SIZE):
+        """This function calls 'MambaPasswordVaultDB.prune_history' on every shard file, one at a time.
+
+        Returns:
+            int: Returns the total number of previous passwords deleted
+        """
+        pruned = 0
+        for path in self.shard_paths():
+            with self.shard(path) as db:
+                pruned += db.prune_history(batch_size)
+        return pruned
+
+    def delete_password(self, username, website):
+        """This function calls 'MambaPasswordVaultDB.delete_password' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.delete_password(username, website)
+
+    def unlock_vault(self, username):
+        """This function calls 'MambaPasswordVaultDB.unlock_vault' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.unlock_vault(username)
+
+    def get_session(self, username):
+        """This function calls 'MambaPasswordVaultDB.get_session' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.get_session(username)
+
+    def lock_vault(self, username):
+        """This function calls 'MambaPasswordVaultDB.lock_vault' on the user's shard if it is open. A shard which has been closed has
+        already dropped its sessions and revealed passwords, so there is nothing to lock.
+
+        Returns:
+            Boolean: Returns True if a session was evicted, otherwise it returns False
+        """
+        with self.lock:
+            db = self.open_shards.get(self.get_shard_path(username))
+        return db is not None and db.lock_vault(username)
+
+    def website_exists(self, username, website):
+        """This function calls 'MambaPasswordVaultDB.website_exists' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.website_exists(username, website)
+
+    def export_passwords(self, username, file_path=None, progress=None):
+        """This function calls 'MambaPasswordVaultDB.export_passwords' on the user's shard."""
+        with self.user_shard(username) as db:
+            return db.export_passwords(username, file_path, progress)
+
+    def sync(self, other_db_path):
+        """This function syncs every shard file with the shard file of the same name in another shard directory, such as one used on
+        another workstation with the same shard mode. Shard files which only exist in the other directory are created here.
+
+        Args:
+            other_db_path (str): The path of the other shard directory
+
+        Returns:
+            tuple: Returns the number of changes applied to this vault, and the number applied to the other vault
+        """
+        os.makedirs(other_db_path, exist_ok=True)
+        names = {os.path.basename(path) for path in self.shard_paths()}
+        names.update(name for name in os.listdir(other_db_path) if name.endswith(".db"))
+
+        pulled = pushed = 0
+        for name in sorted(names):
+            with self.shard(os.path.join(self.shard_dir, name)) as db:
+                shard_pulled, shard_pushed = db.sync(os.path.join(other_db_path, name))
+            pulled += shard_pulled
+            pushed += shard_pushed
+        return pulled, pushed
@@ -0,0 +1,116 @@
+# Mamba Password Manager - Website Completer
+
+# Modules
+import bisect
+import sys
+
+# Constants
+COMPLETION_LIMIT = 5
+
+
+def fold(website):
+    """This function returns the lower case key of a website name, reusing the original string when it is already lower case so it isn't
+    stored twice.
+
+    Args:
+        website (str): The website name
+
+    Returns:
+        str: Returns the lower case website name
+    """
+    key = website.lower()
+    return website if key == website else key
+
+
+# Mamba Password Manager - Website Completer Class
+class MambaWebsiteCompleter:
+    def __init__(self, websites=()):
+        """This function initialises the 'MambaWebsiteCompleter' class, an in-memory prefix index of the logged in user's website names used
+        for type-ahead. Website names are kept in a sorted array, so every name starting with a prefix sits in one contiguous run which is
+        found with a binary search, without a database query or a node per character.
+
+        Args:
+            websites (iterable): The website names to index
+        """
+        pairs = sorted((fold(website), website) for website in websites)
+        self.keys = [key for key, _ in pairs]
+        # lower case website names, sorted, so completions ignore case
+        self.websites = [website for _, website in pairs]
+        # the original website names, in the same order as the keys
+
+    def __len__(self):
+        """This function returns the number of website names in the index."""
+        return len(self.keys)
+
+    def __contains__(self, website):
+        """This function checks whether a website name is in the index."""
+        index = bisect.bisect_left(self.keys, website.lower())
+        while index < len(self.keys) and self.keys[index] == website.lower():
+            if self.websites[index] == website:
+                return True
+            index += 1
+        return False
+
+    def add(self, website):
+        """This function adds a website name to the index, keeping it sorted.
+
+        Args:
+            website (str): The website name to add
+        """
+        if website in self:
+            return
+        key = fold(website)
+        index = bisect.bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.websites.insert(index, website)
+
+    def remove(self, website):
+        """This function removes a website name from the index, if it is in it.
+
+        Args:
+            website (str): The website name to remove
+        """
+        index = bisect.bisect_left(self.keys, website.lower())
+        while index < len(self.keys) and self.keys[index] == website.lower():
+            if self.websites[index] == website:
+                del self.keys[index]
+                del self.websites[index]
+                return
+            index += 1
+
+    def complete(self, prefix, limit=COMPLETION_LIMIT):
+        """This function finds the website names which start with a prefix, ignoring case.
+
+        Args:
+            prefix (str): The text typed so far
+            limit (int): The maximum number of completions to return
+
+        Returns:
+            list: Returns up to 'limit' website names starting with the prefix, in alphabetical order
+        """
+        if not prefix:
+            return []
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.keys, prefix)
+        end = min(start + limit, len(self.keys))
+        # only the first 'limit' names after the start of the run need to be checked
+        return [
+            self.websites[index]
+            for index in range(start, end)
+            if self.keys[index].startswith(prefix)
+        ]
+
+    def memory_usage(self):
+        """This function measures the memory used by the index, including the website name strings.
+
+        Returns:
+            int: Returns the number of bytes used by the index
+        """
+        strings = {id(key): key for key in self.keys}
+        strings.update({id(website): website for website in self.websites})
+        # names which are already lower case are shared by both lists, so they are only counted once
+        return (
+            sys.getsizeof(self.keys)
+            + sys.getsizeof(self.websites)
+            + sum(sys.getsizeof(string) for string in strings.values())
+        )